@@ -1,17 +1,31 @@
 import dash
-from dash import dcc, html
+from dash import dcc, html, dash_table
 from dash.dependencies import Input, Output, State
 import dash_bootstrap_components as dbc
 import plotly.express as px
 import pandas as pd
 import matplotlib.colors as mcolors
 import nasa
+import topk
+import rollups
+import backfill
+import datetime
+import payloads
+import os
 import webbrowser
 import threading
 
 
+# Optional backfill archive (see python -m nasa backfill), when set the Top-K tab queries it instead of the downloaded data
+ARCHIVE_DIR = os.environ.get("NEO_ARCHIVE_DIR")
+
+# Opt-in fast path for the payloads sent to the browser (typed arrays, column-wise store, compressed responses), see payloads.py
+FAST_PAYLOADS = os.environ.get("NEO_FAST_PAYLOADS") == "1"
+
 # Initialize the Dash app with Bootstrap styles for a responsive and visually appealing layout
 app = dash.Dash(__name__, external_stylesheets=[dbc.themes.BOOTSTRAP])
+if FAST_PAYLOADS:
+    payloads.enable(app)
 
 # Data mapping for dropdowns in the histogram and box plot tab
 # This dictionary maps user-friendly category names to their corresponding DataFrame column names
@@ -61,6 +75,10 @@ velocity_options = {
 # List of color options available for customization of the plots
 color_options = ['red', 'green', 'blue', 'yellow', 'black', 'purple', 'lime', 'teal', 'grey', 'brown', 'olive']
 
+# Function to prepare a figure for sending, compacted to typed arrays when the fast path is enabled
+def output_figure(fig):
+    return payloads.compact_figure(fig) if FAST_PAYLOADS else fig
+
 # Function to create info modals
 def create_info_modal(tab_id, title, content):
     return dbc.Modal(
@@ -357,6 +375,95 @@ app.layout = html.Div([
             tab_id="bar-chart",
             title="Bar Chart",
             content="This tab displays the daily count of asteroids. Select whether to display hazardous, non-hazardous, or both types of asteroids from the dropdown menu. Adjust the X-axis and Y-axis scales using the sliders to zoom in or out on the chart."
+        ),
+
+        # Tab for Top-K extreme objects
+        dbc.Tab(label='Top-K Objects', children=[
+            html.Div([
+                html.H2("Most Extreme Asteroid Approaches", style={'textAlign': 'center', 'marginTop': '20px'}),
+                html.Div([
+                    dbc.Button("Tab Instructions", id="open-top-k-modal", n_clicks=0, className="mb-3"),
+                ], style={'textAlign': 'center'}),
+                html.Div([
+                    # Dropdown for selecting the ranking metric
+                    html.Div([
+                        html.Label("Rank By:"),
+                        dcc.Dropdown(
+                            id='top-k-metric-dropdown',
+                            options=[{'label': v, 'value': k} for k, v in topk.metric_labels.items()],
+                            value='closest',
+                            style={'width': '100%'}
+                        ),
+                    ], style={'width': '45%', 'display': 'inline-block', 'verticalAlign': 'top'}),
+
+                    # Input for the number of objects and the hazardous filter
+                    html.Div([
+                        html.Label("Number of Objects (K):"),
+                        dcc.Input(id='top-k-input', type='number', min=1, max=topk.SUMMARY_K, step=1, value=100, debounce=True, style={'width': '100%'}),
+                        dcc.Checklist(
+                            id='top-k-hazardous-checklist',
+                            options=[{'label': ' Hazardous asteroids only', 'value': 'hazardous'}],
+                            value=[],
+                            style={'marginTop': '10px'}
+                        ),
+                    ], style={'width': '45%', 'display': 'inline-block', 'verticalAlign': 'top', 'marginLeft': '5%'})
+                ], style={'width': '70%', 'margin': 'auto', 'marginTop': '20px', 'display': 'flex', 'justify-content': 'space-between'}),
+                dcc.Graph(id='top-k-chart', style={'width': '70%', 'margin': 'auto', 'marginTop': '20px'}),
+                html.Div([
+                    dash_table.DataTable(
+                        id='top-k-table',
+                        page_size=20,
+                        sort_action='native',
+                        style_table={'overflowX': 'auto'},
+                        style_cell={'textAlign': 'left', 'padding': '5px'}
+                    )
+                ], style={'width': '70%', 'margin': 'auto', 'marginTop': '20px', 'marginBottom': '20px'})
+            ])
+        ]),
+        create_info_modal(
+            tab_id="top-k",
+            title="Top-K Objects",
+            content="This tab lists the most extreme asteroids of the selected date range: the closest approaches, the fastest or the largest objects. Choose the ranking from the dropdown, enter how many objects to show and tick the checkbox to rank hazardous asteroids only. The chart shows the ranked values and the table below lists the objects, click a column header to sort the table."
+        ),
+
+        # Tab for rolling time series
+        dbc.Tab(label='Time Series', children=[
+            html.Div([
+                html.H2("Rolling Asteroid Statistics", style={'textAlign': 'center', 'marginTop': '20px'}),
+                html.Div([
+                    dbc.Button("Tab Instructions", id="open-time-series-modal", n_clicks=0, className="mb-3"),
+                ], style={'textAlign': 'center'}),
+                html.Div([
+                    # Dropdown for selecting the rolling statistic
+                    html.Div([
+                        html.Label("Statistic:"),
+                        dcc.Dropdown(
+                            id='time-series-metric-dropdown',
+                            options=[{'label': v, 'value': k} for k, v in rollups.metric_labels.items()],
+                            value='count',
+                            style={'width': '100%'}
+                        ),
+                    ], style={'width': '45%', 'display': 'inline-block', 'verticalAlign': 'top'}),
+
+                    # Checklist for selecting the rolling windows
+                    html.Div([
+                        html.Label("Rolling Windows:"),
+                        dcc.Checklist(
+                            id='time-series-window-checklist',
+                            options=[{'label': f' {w} days', 'value': w} for w in rollups.WINDOWS],
+                            value=[7, 30],
+                            inline=True,
+                            inputStyle={'marginLeft': '10px'}
+                        ),
+                    ], style={'width': '45%', 'display': 'inline-block', 'verticalAlign': 'top', 'marginLeft': '5%'})
+                ], style={'width': '70%', 'margin': 'auto', 'marginTop': '20px', 'display': 'flex', 'justify-content': 'space-between'}),
+                dcc.Graph(id='time-series-chart', style={'width': '70%', 'margin': 'auto', 'marginTop': '20px'})
+            ])
+        ]),
+        create_info_modal(
+            tab_id="time-series",
+            title="Time Series",
+            content="This tab shows rolling statistics of the asteroid approaches: the number of asteroids, the fraction of hazardous asteroids and the median miss distance over the last 7, 30 or 365 days. Choose the statistic from the dropdown and tick the windows to display. A window is drawn from the first day it is completely covered by data, so with downloaded data the longer windows need a longer date range. When an archive is configured, the days before the start date are taken from the archive and extending the date range only processes the added days."
         )
     ])
 ])
@@ -375,7 +482,9 @@ def update_output(api_key, start_date_input, end_date_input):
     if start_date_input and end_date_input and api_key:
         try:
             final_df = nasa.download_data(api_key, start_date_input, end_date_input)
-            return final_df.to_dict(), f"Count of Asteroids: {len(final_df)}", None
+            # The fast path stores the columns as plain lists, without repeating the row index for every value
+            data = final_df.to_dict('list') if FAST_PAYLOADS else final_df.to_dict()
+            return data, f"Count of Asteroids: {len(final_df)}", None
         except Exception as e:
             return None, "", str(e)
     else:
@@ -457,7 +566,7 @@ def update_plot(final_df, selected_type, plot_type, bins, transparency, *args):
     # Update layout for better visualization
     fig.update_layout(title={'font': {'size': 20}})
 
-    return fig
+    return output_figure(fig)
 
 # Callback to update slider parameters for scatter plot based on selected unit
 @app.callback(
@@ -567,7 +676,7 @@ def update_plot_scatter(final_df, unit, min_size, max_size, velocity_unit, plot_
     fig.update_xaxes(showgrid=True, gridcolor='lightgray')
     fig.update_yaxes(showgrid=True, gridcolor='lightgray')
     
-    return fig
+    return output_figure(fig)
 
 # Callback to update the bar chart based on dropdown selection and sliders
 @app.callback(
@@ -624,35 +733,139 @@ def update_chart(final_df, hazard_status, x_scale, y_scale):
         margin=dict(l=40, r=40, t=40, b=40)
     )
 
-    return fig
+    return output_figure(fig)
+
+# Callback to update the Top-K chart and table, from the archive when NEO_ARCHIVE_DIR is set and otherwise from the downloaded data
+@app.callback(
+    [Output('top-k-chart', 'figure'),
+     Output('top-k-table', 'data'),
+     Output('top-k-table', 'columns')],
+    [Input('final-df', 'data'),
+     Input('date-picker-range', 'start_date'),
+     Input('date-picker-range', 'end_date'),
+     Input('top-k-metric-dropdown', 'value'),
+     Input('top-k-input', 'value'),
+     Input('top-k-hazardous-checklist', 'value')]
+)
+def update_top_k(final_df, start_date, end_date, metric, k, hazardous):
+    if not k:
+        return {}, [], []
+    hazardous_only = 'hazardous' in hazardous
+
+    if ARCHIVE_DIR:
+        top_df = topk.query_archive(ARCHIVE_DIR, metric, int(k), start_date, end_date, hazardous_only)
+    elif final_df is not None:
+        top_df = topk.top_k(pd.DataFrame.from_dict(final_df, orient="columns"), metric, int(k), hazardous_only)
+    else:
+        return {}, [], []
+
+    top_df = top_df[[c for c in topk.result_columns if c in top_df.columns]]
+    column = topk.metrics[metric][0]
+    top_df[column] = pd.to_numeric(top_df[column], errors='coerce')
+    top_df.insert(0, 'rank', range(1, len(top_df) + 1))
+
+    # Create the bar chart of the ranked values
+    fig = px.bar(top_df, x='rank', y=column, color=topk.HAZARD_COLUMN, hover_data=['name', 'date'],
+                 labels={'rank': 'Rank', column: column, topk.HAZARD_COLUMN: 'Hazardous'},
+                 title=f'<b>{topk.metric_labels[metric]}</b>')
+    fig.update_layout(title={'font': {'size': 20}})
+
+    columns = [{'name': c, 'id': c} for c in top_df.columns if c != 'nasa_jpl_url']
+    return output_figure(fig), top_df.to_dict('records'), columns
+
+# Rolling aggregator over the daily rollups of the archive, kept between callbacks so that extending the date range
+# only processes the added days. It is rebuilt when the archive changes, the lock protects it from concurrent callbacks.
+archive_aggregator = rollups.RollingAggregator()
+archive_aggregator_version = None
+archive_aggregator_lock = threading.Lock()
+
+# Function to return the version of the archive from two cheap file checks: the modification times of the manifest,
+# which the backfill rewrites after every completed window, and of the version file rewritten by rollups.build_rollups
+def archive_version(archive_dir):
+    version = [archive_dir]
+    for name in (backfill.MANIFEST_NAME, rollups.ROLLUP_VERSION_NAME):
+        path = os.path.join(archive_dir, name)
+        version.append(os.path.getmtime(path) if os.path.exists(path) else None)
+    return tuple(version)
+
+# Function to return the rolling statistics of the archive between two dates, including the lookback of the longest window
+def archive_time_series(start_date, end_date):
+    global archive_aggregator, archive_aggregator_version
+    end = datetime.date.fromisoformat(end_date[:10])
+    start = datetime.date.fromisoformat(start_date[:10]) - datetime.timedelta(days=max(rollups.WINDOWS) - 1)
+    with archive_aggregator_lock:
+        # A changed archive or a range which is neither overlapping nor adjacent to the covered one starts a new aggregator
+        aggregator = archive_aggregator
+        version = archive_version(ARCHIVE_DIR)
+        if version != archive_aggregator_version or aggregator.first_day is not None and (
+                end < aggregator.first_day - datetime.timedelta(days=1) or start > aggregator.last_day + datetime.timedelta(days=1)):
+            aggregator = archive_aggregator = rollups.RollingAggregator()
+            archive_aggregator_version = version
+        for missing_start, missing_end in aggregator.missing(start, end):
+            daily = rollups.load_daily_rollups(ARCHIVE_DIR, missing_start.isoformat(), missing_end.isoformat())
+            # Days which are not downloaded into the archive yet leave the windows containing them empty instead of counting as zero
+            covered = backfill.covered_days(ARCHIVE_DIR, missing_start.isoformat(), missing_end.isoformat())
+            aggregator.extend(daily, missing_start, missing_end, covered)
+        return aggregator.frame(start_date[:10], end)
+
+# Callback to update the rolling time-series chart, from the archive rollups when NEO_ARCHIVE_DIR is set and otherwise from the downloaded data
+@app.callback(
+    Output('time-series-chart', 'figure'),
+    [Input('final-df', 'data'),
+     Input('date-picker-range', 'start_date'),
+     Input('date-picker-range', 'end_date'),
+     Input('time-series-metric-dropdown', 'value'),
+     Input('time-series-window-checklist', 'value')]
+)
+def update_time_series(final_df, start_date, end_date, metric, windows):
+    if not windows:
+        return {}
+
+    if ARCHIVE_DIR and start_date and end_date:
+        series = archive_time_series(start_date, end_date)
+    elif final_df is not None:
+        final_df = pd.DataFrame.from_dict(final_df, orient="columns")
+        daily = rollups.daily_rollup(final_df)
+        aggregator = rollups.RollingAggregator()
+        aggregator.extend(daily, daily['date'].min().date(), daily['date'].max().date())
+        series = aggregator.frame()
+    else:
+        return {}
+
+    # Reshape the selected windows to one line per window
+    columns = {f"{metric}_{w}d": f"{w} days" for w in sorted(windows)}
+    long_df = series.rename(columns=columns).melt(id_vars='date', value_vars=list(columns.values()), var_name='Window', value_name=metric)
+
+    # Create the line chart
+    fig = px.line(long_df, x='date', y=metric, color='Window',
+                  labels={'date': 'Date', metric: rollups.metric_labels[metric]},
+                  title=f'<b>Rolling {rollups.metric_labels[metric]}</b>')
+    if metric == 'median_miss_km':
+        fig.update_yaxes(type='log')
+    fig.update_layout(title={'font': {'size': 20}}, xaxis={'tickformat': '%Y-%m-%d'})
+
+    return output_figure(fig)
+
+# Tab ids of the info modals, each modal has an open and a close button
+modal_tabs = ["histogram-boxplot", "scatter-plot", "bar-chart", "top-k", "time-series"]
 
 # Callback to handle opening and closing of modals
 @app.callback(
-    [Output("histogram-boxplot-modal", "is_open"),
-     Output("scatter-plot-modal", "is_open"),
-     Output("bar-chart-modal", "is_open")],
-    [Input("open-histogram-boxplot-modal", "n_clicks"),
-     Input("open-scatter-plot-modal", "n_clicks"),
-     Input("open-bar-chart-modal", "n_clicks"),
-     Input("close-histogram-boxplot-modal", "n_clicks"),
-     Input("close-scatter-plot-modal", "n_clicks"),
-     Input("close-bar-chart-modal", "n_clicks")],
-    [State("histogram-boxplot-modal", "is_open"),
-     State("scatter-plot-modal", "is_open"),
-     State("bar-chart-modal", "is_open")],
+    [Output(f"{tab}-modal", "is_open") for tab in modal_tabs],
+    [Input(f"open-{tab}-modal", "n_clicks") for tab in modal_tabs] +
+    [Input(f"close-{tab}-modal", "n_clicks") for tab in modal_tabs],
+    [State(f"{tab}-modal", "is_open") for tab in modal_tabs],
 )
-def toggle_modal(n1, n2, n3, n4, n5, n6, is_open1, is_open2, is_open3):
+def toggle_modal(*args):
+    is_open = list(args[2 * len(modal_tabs):])
     ctx = dash.callback_context
     if not ctx.triggered:
-        return [is_open1, is_open2, is_open3]
+        return is_open
     button_id = ctx.triggered[0]["prop_id"].split(".")[0]
-    if button_id == "open-histogram-boxplot-modal" or button_id == "close-histogram-boxplot-modal":
-        return [not is_open1, is_open2, is_open3]
-    elif button_id == "open-scatter-plot-modal" or button_id == "close-scatter-plot-modal":
-        return [is_open1, not is_open2, is_open3]
-    elif button_id == "open-bar-chart-modal" or button_id == "close-bar-chart-modal":
-        return [is_open1, is_open2, not is_open3]
-    return [is_open1, is_open2, is_open3]
+    for i, tab in enumerate(modal_tabs):
+        if button_id == f"open-{tab}-modal" or button_id == f"close-{tab}-modal":
+            is_open[i] = not is_open[i]
+    return is_open
 
 # Defining a function to open the browser
 def open_browser():
@@ -0,0 +1,287 @@
+import os
+import json
+import time
+import datetime
+import requests
+import numpy as np
+import pandas as pd
+import nasa
+import topk
+import rollups
+
+# Resumable bulk download of the NeoWs feed into a partitioned Parquet archive.
+# The archive layout is <out>/year=YYYY/month=MM/<window start>_<window end>.parquet, completed windows are
+# recorded in <out>/_manifest.json so that a killed run continues with the first window that is not in the manifest.
+
+MANIFEST_NAME = "_manifest.json"
+
+# The feed endpoint accepts at most 7 days between start and end date, i.e. 8 days per request
+WINDOW_DAYS = 8
+
+# Seconds to wait for the API to answer a request before it is retried
+REQUEST_TIMEOUT = 30
+
+# Period of the API quota in seconds, X-RateLimit-Limit is the number of requests allowed per hour
+QUOTA_PERIOD = 3600
+
+# Columns delivered by the API as strings which are stored as numbers in the archive
+NUMERIC_COLUMNS = [
+    'absolute_magnitude_h',
+    'kilometers.estimated_diameter_min', 'kilometers.estimated_diameter_max',
+    'meters.estimated_diameter_min', 'meters.estimated_diameter_max',
+    'miles.estimated_diameter_min', 'miles.estimated_diameter_max',
+    'feet.estimated_diameter_min', 'feet.estimated_diameter_max',
+    'epoch_date_close_approach',
+    'relative_velocity_km/s', 'relative_velocity_km/h', 'relative_velocity_m/h',
+    'miss_dist_astromnomical', 'miss_dist_lunar', 'miss_dist_km', 'miss_dist_miles'
+]
+
+
+# This function splits the date range into windows of window_days days. The windows are aligned to fixed blocks
+# counted from 1970-01-01 and always cover a whole block, so runs over different or extended ranges reuse the same
+# windows and never store a day twice. Returned as (start, end) date strings.
+def plan_windows(start_date, end_date, window_days=WINDOW_DAYS):
+    epoch = datetime.date(1970, 1, 1)
+    start = datetime.date.fromisoformat(start_date)
+    end = datetime.date.fromisoformat(end_date)
+    if start > end:
+        raise ValueError(f"The start date {start_date} is after the end date {end_date}")
+    block_start = start - datetime.timedelta(days=(start - epoch).days % window_days)
+    windows = []
+    while block_start <= end:
+        block_end = block_start + datetime.timedelta(days=window_days - 1)
+        windows.append((block_start.isoformat(), block_end.isoformat()))
+        block_start = block_end + datetime.timedelta(days=1)
+    return windows
+
+
+# This function returns the key under which a window is stored in the manifest.
+def window_key(window):
+    return f"{window[0]}_{window[1]}"
+
+
+# This function loads the manifest of an archive, a missing manifest means that nothing has been downloaded yet.
+# The window size is part of the archive, resuming with a different one would produce overlapping windows.
+def load_manifest(out_dir, window_days=WINDOW_DAYS):
+    path = os.path.join(out_dir, MANIFEST_NAME)
+    if not os.path.exists(path):
+        return {"window_days": window_days, "windows": {}}
+    with open(path) as f:
+        manifest = json.load(f)
+    if manifest["window_days"] != window_days:
+        raise Exception(f"The archive in {out_dir} was built with {manifest['window_days']} day windows, not {window_days}")
+    return manifest
+
+
+# This function returns for every day between start_date and end_date (both inclusive) whether it lies in a window
+# completed according to the manifest. An archive without a manifest was not written by the backfill and counts as complete.
+def covered_days(out_dir, start_date, end_date):
+    days = pd.date_range(start_date, end_date, freq='D')
+    path = os.path.join(out_dir, MANIFEST_NAME)
+    if not os.path.exists(path):
+        return np.ones(len(days), dtype=bool)
+    with open(path) as f:
+        windows = sorted(tuple(pd.Timestamp(d) for d in key.split("_")) for key in json.load(f)["windows"])
+    if not windows:
+        return np.zeros(len(days), dtype=bool)
+    # The windows never overlap, so a day is covered when it is not after the end of the last window starting before it
+    starts = pd.DatetimeIndex([w[0] for w in windows])
+    ends = pd.DatetimeIndex([w[1] for w in windows])
+    index = starts.searchsorted(days, side='right') - 1
+    return (index >= 0) & (days <= ends[np.maximum(index, 0)])
+
+
+# This function writes the manifest atomically, so that a run killed while saving never leaves a truncated file behind.
+def save_manifest(out_dir, manifest):
+    path = os.path.join(out_dir, MANIFEST_NAME)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(manifest, f, indent=1, sort_keys=True)
+    os.replace(tmp_path, path)
+
+
+# Spacing of the requests within the API quota. The X-RateLimit-Limit header of a response sets the interval between
+# requests to the quota period divided by the limit (at least min_interval), so a long run never uses the quota up.
+# When X-RateLimit-Remaining reaches zero anyway, e.g. because the key is shared, the next request waits for the quota to reset.
+class RequestPacer:
+
+    def __init__(self, min_interval=0.0, quota_period=QUOTA_PERIOD, log=print):
+        self.min_interval = min_interval
+        self.interval = min_interval
+        self.quota_period = quota_period
+        self.log = log
+        self.next_request = 0.0
+
+    # This method sleeps until the next request is allowed
+    def wait(self):
+        delay = self.next_request - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+        self.next_request = time.monotonic() + self.interval
+
+    # This method delays the next request by at least the given number of seconds from now
+    def delay(self, seconds):
+        self.next_request = max(self.next_request, time.monotonic() + seconds)
+
+    # This method adapts the spacing to the rate limit headers of a successful response
+    def update(self, headers):
+        limit = headers.get("X-RateLimit-Limit", "")
+        if limit.isdigit() and int(limit) > 0:
+            self.interval = max(self.min_interval, self.quota_period / int(limit))
+        if headers.get("X-RateLimit-Remaining") == "0":
+            self.wait_for_quota()
+
+    # This method delays the next request until the quota has reset
+    def wait_for_quota(self):
+        self.log(f"API quota used up, waiting {self.quota_period:.0f} s for it to reset")
+        self.delay(self.quota_period)
+
+
+# This function requests one window from the feed endpoint, spaced out by the pacer to stay within the API quota.
+# Responses with HTTP 429 or a server error, timeouts and connection errors are retried after the Retry-After header
+# or an exponential backoff, a 429 without Retry-After means that the quota is used up and is retried after it reset.
+def fetch_window(api_key, window, base_url=None, max_retries=5, backoff=2.0, session=None, timeout=REQUEST_TIMEOUT, pacer=None):
+    session = session or requests
+    pacer = pacer or RequestPacer()
+    request_url = f"{base_url or nasa.NASA_API_URL}?start_date={window[0]}&end_date={window[1]}&api_key={api_key}"
+    for attempt in range(max_retries + 1):
+        pacer.wait()
+        try:
+            r = session.get(request_url, timeout=timeout)
+        except requests.RequestException as e:
+            if attempt < max_retries:
+                pacer.delay(backoff * 2 ** attempt)
+                continue
+            raise Exception(f"Window {window[0]}..{window[1]} failed after {max_retries + 1} attempts: {e}") from e
+        if r.status_code == 200:
+            pacer.update(r.headers)
+            return r.json()
+        if (r.status_code == 429 or r.status_code >= 500) and attempt < max_retries:
+            retry_after = r.headers.get("Retry-After")
+            if retry_after and retry_after.isdigit():
+                pacer.delay(float(retry_after))
+            elif r.status_code == 429:
+                pacer.wait_for_quota()
+            else:
+                pacer.delay(backoff * 2 ** attempt)
+            continue
+        try:
+            error_message = r.json()["error"]["message"]
+        except (ValueError, KeyError, TypeError):
+            error_message = r.text
+        if r.status_code == 429:
+            error_message += " Run the backfill again after the API quota has reset to resume it."
+        raise Exception(f"Window {window[0]}..{window[1]} failed with HTTP {r.status_code}: {error_message}")
+
+
+# This function converts the processed DataFrame to a column layout which can be stored in Parquet files,
+# numeric strings become floats and nested values (dictionaries, lists) are stored as JSON strings.
+def prepare_for_storage(df):
+    df = df.copy()
+    for column in NUMERIC_COLUMNS:
+        if column in df.columns:
+            df[column] = pd.to_numeric(df[column], errors='coerce')
+    for column in df.columns[df.dtypes == object]:
+        if df[column].map(lambda x: isinstance(x, (dict, list))).any():
+            df[column] = df[column].map(lambda x: json.dumps(x) if isinstance(x, (dict, list)) else x)
+    return df
+
+
+# This function writes the rows of one window into the year/month partitions and returns the written paths relative to the archive.
+def write_partitions(out_dir, window, df):
+    paths = []
+    for month, part in df.groupby(df['date'].str[:7]):
+        partition = os.path.join(f"year={month[:4]}", f"month={month[5:7]}")
+        os.makedirs(os.path.join(out_dir, partition), exist_ok=True)
+        path = os.path.join(partition, f"{window_key(window)}.parquet")
+        part.reset_index(drop=True).to_parquet(os.path.join(out_dir, path), index=False)
+        paths.append(path)
+    return paths
+
+
+# This function rebuilds the top-K summaries and the daily rollups of every partition whose files are older than its data.
+def refresh_summaries(out_dir):
+    partitions = topk.list_partitions(out_dir)
+    topk.build_summaries(out_dir, [p for p in partitions if not topk.summary_is_fresh(out_dir, p)])
+    rollups.build_rollups(out_dir, [p for p in partitions if not topk.summary_is_fresh(out_dir, p, rollups.ROLLUP_NAME)])
+
+
+# This function downloads every window of the date range that is not yet in the manifest and reports the throughput.
+def run_backfill(api_key, start_date, end_date, out_dir, base_url=None, window_days=WINDOW_DAYS,
+                 min_interval=0.0, max_retries=5, backoff=2.0, timeout=REQUEST_TIMEOUT, quota_period=QUOTA_PERIOD, log=print):
+    os.makedirs(out_dir, exist_ok=True)
+    manifest = load_manifest(out_dir, window_days)
+    windows = plan_windows(start_date, end_date, window_days)
+    pending = [w for w in windows if window_key(w) not in manifest["windows"]]
+    log(f"{len(windows)} windows planned, {len(windows) - len(pending)} already completed, {len(pending)} to download")
+
+    session = requests.Session()
+    pacer = RequestPacer(min_interval, quota_period, log)
+    started = time.monotonic()
+    rows = 0
+    try:
+        for i, window in enumerate(pending, start=1):
+            feed = fetch_window(api_key, window, base_url, max_retries, backoff, session, timeout, pacer)
+            raw = nasa.feed_frame(feed)
+            paths = []
+            window_rows = 0
+            if not raw.empty:
+                df = prepare_for_storage(nasa.process_raw(raw))
+                paths = write_partitions(out_dir, window, df)
+                window_rows = len(df)
+                rows += window_rows
+
+            # The window is recorded only after its files are written, an interrupted window is downloaded again on resume
+            manifest["windows"][window_key(window)] = {
+                "rows": window_rows,
+                "files": paths,
+                "completed_at": datetime.datetime.now().isoformat(timespec="seconds")
+            }
+            save_manifest(out_dir, manifest)
+
+            elapsed = max(time.monotonic() - started, 1e-9)
+            log(f"[{i}/{len(pending)}] {window[0]}..{window[1]}: {window_rows} rows "
+                f"({i / elapsed * 60:.1f} windows/min, {rows / elapsed:.1f} rows/s)")
+    finally:
+        # Refresh the top-K summaries and daily rollups also when the run fails, partitions left stale by an earlier
+        # run which was killed are refreshed as well
+        refresh_summaries(out_dir)
+
+    elapsed = time.monotonic() - started
+    log(f"Downloaded {len(pending)} windows with {rows} rows in {elapsed:.1f} s")
+    return {"windows": len(pending), "rows": rows, "seconds": elapsed}
+
+
+# This function registers the options of the backfill command on an argparse parser.
+def add_arguments(parser):
+    parser.add_argument("--start", required=True, help="First date of the range (YYYY-MM-DD).")
+    parser.add_argument("--end", required=True, help="Last date of the range (YYYY-MM-DD).")
+    parser.add_argument("--out", required=True, help="Directory of the partitioned archive.")
+    parser.add_argument("--api-key", default=os.environ.get("NASA_API_KEY", "DEMO_KEY"),
+                        help="NASA API key, defaults to the NASA_API_KEY environment variable.")
+    parser.add_argument("--base-url", default=None, help="Feed endpoint URL, e.g. of a local stub API.")
+    parser.add_argument("--window-days", type=int, default=WINDOW_DAYS, help="Days per request, at most 8.")
+    parser.add_argument("--min-interval", type=float, default=0.0, help="Minimum number of seconds between requests, raised to fit the hourly quota reported by the API.")
+    parser.add_argument("--max-retries", type=int, default=5, help="Retries of a rate limited or failed request.")
+    parser.add_argument("--backoff", type=float, default=2.0, help="Base delay in seconds of the exponential backoff.")
+    parser.add_argument("--timeout", type=float, default=REQUEST_TIMEOUT, help="Seconds to wait for a response before retrying.")
+    parser.set_defaults(func=command)
+
+
+# This function runs the backfill command with the parsed command line arguments.
+def command(args):
+    if not 1 <= args.window_days <= WINDOW_DAYS:
+        raise SystemExit(f"--window-days must be between 1 and {WINDOW_DAYS}")
+    try:
+        start, end = datetime.date.fromisoformat(args.start), datetime.date.fromisoformat(args.end)
+    except ValueError as e:
+        raise SystemExit(f"--start and --end must be dates in the format YYYY-MM-DD: {e}")
+    if start > end:
+        raise SystemExit(f"--start {args.start} is after --end {args.end}")
+    try:
+        run_backfill(args.api_key, args.start, args.end, args.out, args.base_url, args.window_days,
+                     args.min_interval, args.max_retries, args.backoff, args.timeout)
+    except Exception as e:
+        # The completed windows are in the manifest, so the same command resumes the run
+        raise SystemExit(f"Backfill stopped: {e}")
+    return 0
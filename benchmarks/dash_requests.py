@@ -0,0 +1,55 @@
+# Helpers to call the dashboard callbacks over HTTP the way the browser does, through the /_dash-update-component endpoint.
+# The callback definitions are read from /_dash-dependencies and the initial property values from /_dash-layout,
+# so requests only have to name the properties that differ from the initial layout.
+
+UPDATE_PATH = "/_dash-update-component"
+
+
+# This function collects the initial property values of every component with an id in the layout, keyed by "id.property".
+def layout_values(layout):
+    values = {}
+    stack = [layout]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, list):
+            stack.extend(node)
+        elif isinstance(node, dict) and 'props' in node:
+            props = node['props']
+            if 'id' in props:
+                values.update({f"{props['id']}.{k}": v for k, v in props.items() if k != 'children'})
+            stack.append(props.get('children'))
+    return values
+
+
+# This function parses the output string of a callback ("id.prop" or "..id1.prop1...id2.prop2..") into id/property pairs.
+def parse_outputs(output):
+    parts = output[2:-2].split("...") if output.startswith("..") else [output]
+    return [dict(zip(('id', 'property'), part.rsplit(".", 1))) for part in parts]
+
+
+# This function finds the callback whose output string contains the given "id.property".
+def find_callback(dependencies, output):
+    for dependency in dependencies:
+        if output in [f"{o['id']}.{o['property']}" for o in parse_outputs(dependency['output'])]:
+            return dependency
+    raise KeyError(f"No callback updates {output}")
+
+
+# This function builds the request body of a callback, values maps "id.property" to the current value and
+# changed lists the properties which triggered the callback.
+def callback_body(dependency, values, changed):
+    outputs = parse_outputs(dependency['output'])
+    return {
+        'output': dependency['output'],
+        'outputs': outputs if dependency['output'].startswith("..") else outputs[0],
+        'inputs': [{**i, 'value': values.get(f"{i['id']}.{i['property']}")} for i in dependency['inputs']],
+        'state': [{**s, 'value': values.get(f"{s['id']}.{s['property']}")} for s in dependency.get('state', [])],
+        'changedPropIds': changed,
+    }
+
+
+# This function copies the properties returned by a callback response into the values dictionary.
+def apply_response(values, response):
+    for component_id, props in response.get('response', {}).items():
+        for prop, value in props.items():
+            values[f"{component_id}.{prop}"] = value
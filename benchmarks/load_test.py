@@ -0,0 +1,267 @@
+import os
+import sys
+import json
+import time
+import random
+import socket
+import argparse
+import datetime
+import threading
+import subprocess
+import numpy as np
+import requests
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import dash_requests
+
+# Load test of one dashboard instance with concurrent scripted user sessions, run from the repository root:
+#     python benchmarks/load_test.py --concurrency 1 2 4 8 16 --duration 30 --out load_test.json
+# The dashboard and the local stub of the NeoWs API are started as separate processes. Every virtual user repeats
+# a session of the callbacks the browser sends: pick a date range, let the tabs redraw, switch tabs and drag sliders.
+# Latency percentiles, throughput and the memory of the dashboard process are reported per concurrency level and
+# saved as JSON, a previous result file can be passed with --compare to check for regressions.
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Callbacks which the browser fires after the final-df store changed
+STORE_OUTPUTS = ['dynamic-plot.figure', 'min-size-slider.max', 'size-comparison-plot.figure', 'bar-chart.figure', 'top-k-chart.figure',
+                 'time-series-chart.figure']
+
+
+# This function returns a free TCP port on the local machine.
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+# This function starts a process and waits until the given URL answers.
+def start_process(command, url, env=None, timeout=60):
+    process = subprocess.Popen(command, cwd=REPO_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise Exception(f"{' '.join(command)} exited with code {process.returncode}")
+        try:
+            requests.get(url, timeout=1)
+            return process
+        except requests.ConnectionError:
+            time.sleep(0.2)
+    process.kill()
+    raise Exception(f"{url} did not answer within {timeout} s")
+
+
+# This function returns the resident memory of a process in megabytes, read from /proc (Linux) or with psutil when installed.
+def process_rss_mb(pid):
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    try:
+        import psutil
+        return psutil.Process(pid).memory_info().rss / 2 ** 20
+    except Exception:
+        return None
+
+
+# A virtual user: keeps the component values of its browser tab and records the latency of every callback request.
+class UserSession:
+
+    def __init__(self, base_url, dependencies, layout, records, rng, max_days):
+        self.base_url = base_url
+        self.dependencies = dependencies
+        self.initial_values = dash_requests.layout_values(layout)
+        self.records = records
+        self.rng = rng
+        self.max_days = max_days
+        self.http = requests.Session()
+
+    # This method sends one callback request and stores the returned property values
+    def call(self, output, changed):
+        dependency = dash_requests.find_callback(self.dependencies, output)
+        body = dash_requests.callback_body(dependency, self.values, changed)
+        started = time.perf_counter()
+        try:
+            response = self.http.post(self.base_url + dash_requests.UPDATE_PATH, json=body, timeout=120)
+            ok = response.status_code in (200, 204)
+            size = len(response.content)
+            if response.status_code == 200:
+                dash_requests.apply_response(self.values, response.json())
+        except requests.RequestException:
+            ok, size = False, 0
+        self.records.append((output, time.perf_counter() - started, ok, size))
+
+    # This method changes properties of the page and sends the callbacks triggered by them, changed names the triggering
+    # properties when they are not the changed ones (callbacks chained to the output of a previous callback)
+    def change(self, changes, outputs, changed=None):
+        self.values.update(changes)
+        for output in outputs:
+            self.call(output, changed or list(changes))
+
+    # This method runs one scripted session from opening the page to dragging the sliders
+    def run(self):
+        self.values = dict(self.initial_values)
+        start = datetime.date(2000, 1, 1) + datetime.timedelta(days=self.rng.randrange(365 * 20))
+        end = start + datetime.timedelta(days=self.rng.randrange(self.max_days))
+
+        # Enter the API key and pick a date range, the tabs redraw with the downloaded data
+        self.change({'api-key-input.value': 'DEMO_KEY',
+                     'date-picker-range.start_date': start.isoformat(),
+                     'date-picker-range.end_date': end.isoformat()}, ['final-df.data'])
+        self.change({}, STORE_OUTPUTS, ['final-df.data'])
+
+        # Histogram tab: change the parameter and drag the bins slider
+        self.change({'type-dropdown.value': 'miss_dist_km'}, ['dynamic-plot.figure'])
+        for bins in self.rng.sample(range(5, 50), 3):
+            self.change({'bins-slider.value': bins}, ['dynamic-plot.figure'])
+
+        # Scatter tab: switch the diameter unit and drag the size slider
+        self.change({'unit-dropdown.value': 'Kilometers'}, ['min-size-slider.max', 'size-comparison-plot.figure'])
+        self.change({'min-size-slider.value': 0.1}, ['size-comparison-plot.figure'])
+
+        # Bar chart tab: filter hazardous asteroids and drag the y-axis scale
+        self.change({'hazard-dropdown.value': 'False'}, ['bar-chart.figure'])
+        self.change({'y-scale-slider.value': 2}, ['bar-chart.figure'])
+
+        # Top-K tab: rank by velocity
+        self.change({'top-k-metric-dropdown.value': 'fastest'}, ['top-k-chart.figure'])
+
+        # Time series tab: show the median miss distance
+        self.change({'time-series-metric-dropdown.value': 'median_miss_km'}, ['time-series-chart.figure'])
+
+
+# This function computes the latency percentiles in milliseconds of a list of durations in seconds.
+def percentiles(durations):
+    if not durations:
+        return {'p50_ms': None, 'p95_ms': None, 'p99_ms': None}
+    p50, p95, p99 = np.percentile(np.array(durations) * 1000, [50, 95, 99])
+    return {'p50_ms': round(p50, 1), 'p95_ms': round(p95, 1), 'p99_ms': round(p99, 1)}
+
+
+# This function runs the given number of concurrent users for duration seconds and summarizes the requests.
+def run_level(base_url, server_pid, concurrency, duration, max_days, seed):
+    dependencies = requests.get(base_url + "/_dash-dependencies").json()
+    layout = requests.get(base_url + "/_dash-layout").json()
+    records = []
+    stop = threading.Event()
+
+    def user(index):
+        session = UserSession(base_url, dependencies, layout, records, random.Random(seed * 1000 + index), max_days)
+        while not stop.is_set():
+            session.run()
+
+    memory = []
+
+    def sample_memory():
+        while not stop.is_set():
+            memory.append(process_rss_mb(server_pid))
+            time.sleep(0.25)
+
+    threads = [threading.Thread(target=user, args=(i,)) for i in range(concurrency)]
+    sampler = threading.Thread(target=sample_memory)
+    started = time.monotonic()
+    for thread in threads + [sampler]:
+        thread.start()
+    time.sleep(duration)
+    stop.set()
+    for thread in threads + [sampler]:
+        thread.join()
+    elapsed = time.monotonic() - started
+
+    # Sessions finish their current step after the stop, so the throughput counts the whole elapsed time
+    ok = [r for r in records if r[2]]
+    memory = [m for m in memory if m is not None]
+    per_callback = {}
+    for output in sorted({r[0] for r in records}):
+        durations = [r[1] for r in ok if r[0] == output]
+        per_callback[output] = {'requests': len(durations), **percentiles(durations)}
+    return {
+        'concurrency': concurrency,
+        'requests': len(records),
+        'errors': len(records) - len(ok),
+        'throughput_rps': round(len(ok) / elapsed, 2),
+        **percentiles([r[1] for r in ok]),
+        'response_mb': round(sum(r[3] for r in ok) / 2 ** 20, 2),
+        'rss_peak_mb': round(max(memory), 1) if memory else None,
+        'rss_end_mb': round(memory[-1], 1) if memory else None,
+        'per_callback': per_callback,
+    }
+
+
+# This function prints the levels of a result as a table.
+def print_levels(levels):
+    print(f"{'users':>6}{'requests':>10}{'errors':>8}{'req/s':>9}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'RSS peak MB':>13}")
+    for level in levels:
+        print(f"{level['concurrency']:>6}{level['requests']:>10}{level['errors']:>8}{level['throughput_rps']:>9}"
+              f"{level['p50_ms']!s:>10}{level['p95_ms']!s:>10}{level['p99_ms']!s:>10}{level['rss_peak_mb']!s:>13}")
+
+
+# This function compares a result with a baseline result, returns False when the p95 latency or the throughput
+# of a concurrency level present in both is worse than the tolerance (in percent).
+def compare(result, baseline, tolerance):
+    passed = True
+    baseline_levels = {level['concurrency']: level for level in baseline['levels']}
+    print(f"\nComparison with the baseline (tolerance {tolerance:.0f} %)")
+    for level in result['levels']:
+        base = baseline_levels.get(level['concurrency'])
+        if base is None or not base['p95_ms'] or not level['p95_ms'] or not base['throughput_rps']:
+            continue
+        p95_change = (level['p95_ms'] / base['p95_ms'] - 1) * 100
+        rps_change = (level['throughput_rps'] / base['throughput_rps'] - 1) * 100
+        regression = p95_change > tolerance or rps_change < -tolerance
+        passed = passed and not regression
+        print(f"{level['concurrency']:>4} users: p95 {base['p95_ms']} -> {level['p95_ms']} ms ({p95_change:+.0f} %), "
+              f"throughput {base['throughput_rps']} -> {level['throughput_rps']} req/s ({rps_change:+.0f} %)"
+              f"{'  REGRESSION' if regression else ''}")
+    return passed
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Concurrent-user load test of the dashboard callbacks.")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 2, 4, 8, 16], help="Numbers of simultaneous users.")
+    parser.add_argument("--duration", type=float, default=30, help="Seconds per concurrency level.")
+    parser.add_argument("--max-days", type=int, default=30, help="Longest date range picked by a user.")
+    parser.add_argument("--objects-per-day", type=int, default=20, help="Average objects per day served by the stub API.")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", default="load_test.json", help="File the results are saved to.")
+    parser.add_argument("--compare", help="Result file of a previous run to compare with.")
+    parser.add_argument("--tolerance", type=float, default=20, help="Allowed p95 latency and throughput change in percent.")
+    args = parser.parse_args()
+
+    mock_port, app_port = free_port(), free_port()
+    mock_url = f"http://127.0.0.1:{mock_port}"
+    base_url = f"http://127.0.0.1:{app_port}"
+    mock = start_process([sys.executable, "mock_nasa.py", "--port", str(mock_port), "--objects-per-day", str(args.objects_per_day)],
+                         mock_url)
+    env = dict(os.environ, NASA_API_URL=f"{mock_url}/neo/rest/v1/feed")
+    env.pop("NEO_ARCHIVE_DIR", None)
+    app = start_process([sys.executable, "-c", "import sys, Visualization; Visualization.app.run(port=int(sys.argv[1]), debug=False)",
+                         str(app_port)], base_url + "/_dash-layout", env)
+    try:
+        levels = []
+        for concurrency in args.concurrency:
+            print(f"Running {concurrency} users for {args.duration:.0f} s")
+            levels.append(run_level(base_url, app.pid, concurrency, args.duration, args.max_days, args.seed))
+    finally:
+        app.terminate()
+        mock.terminate()
+
+    result = {
+        'created_at': datetime.datetime.now().isoformat(timespec="seconds"),
+        'config': {k: v for k, v in vars(args).items() if k not in ('out', 'compare')},
+        'fast_payloads': os.environ.get("NEO_FAST_PAYLOADS") == "1",
+        'levels': levels,
+    }
+    with open(args.out, "w") as f:
+        json.dump(result, f, indent=1)
+    print()
+    print_levels(levels)
+    print(f"\nSaved to {args.out}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        sys.exit(0 if compare(result, baseline, args.tolerance) else 1)
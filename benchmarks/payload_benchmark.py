@@ -0,0 +1,110 @@
+import os
+import sys
+import json
+import time
+import argparse
+import subprocess
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import dash_requests
+
+# Bytes on the wire and serialization time (figure conversion and JSON encoding) per callback, with and without the fast payload path (NEO_FAST_PAYLOADS=1).
+# Both modes encode JSON with plotly's default engine (orjson when installed), so the comparison measures typed arrays and compression.
+# Every mode runs in its own process against the local stub API, run from the repository root:
+#     python benchmarks/payload_benchmark.py --days 60
+
+# Outputs of the measured callbacks, the first one downloads the data into the final-df store
+MEASURED_OUTPUTS = ['final-df.data', 'dynamic-plot.figure', 'size-comparison-plot.figure', 'bar-chart.figure', 'top-k-chart.figure',
+                    'time-series-chart.figure']
+
+
+# This function measures the callbacks in the current process, the mode is selected by the environment of the process.
+def measure(days, repeat):
+    import mock_nasa
+    server, feed_url = mock_nasa.serve_in_background()
+    os.environ["NASA_API_URL"] = feed_url
+
+    # Time spent serializing the callback responses: the function Dash serializes them with plus output_figure, which
+    # converts the figures to compact dictionaries inside the callbacks when the fast path is enabled
+    import plotly.io.json
+    import datetime
+    import Visualization
+    timings = []
+
+    def timed(function):
+        def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            result = function(*args, **kwargs)
+            timings.append(time.perf_counter() - started)
+            return result
+        return wrapper
+    plotly.io.json.to_json_plotly = timed(plotly.io.json.to_json_plotly)
+    Visualization.output_figure = timed(Visualization.output_figure)
+
+    client = Visualization.app.server.test_client()
+    dependencies = client.get("/_dash-dependencies").get_json()
+    values = dash_requests.layout_values(client.get("/_dash-layout").get_json())
+    start = datetime.date(2020, 1, 1)
+    values.update({
+        'api-key-input.value': 'DEMO_KEY',
+        'date-picker-range.start_date': start.isoformat(),
+        'date-picker-range.end_date': (start + datetime.timedelta(days=days - 1)).isoformat(),
+    })
+
+    results = {}
+    for output in MEASURED_OUTPUTS:
+        dependency = dash_requests.find_callback(dependencies, output)
+        changed = ['date-picker-range.end_date'] if output == 'final-df.data' else ['final-df.data']
+        body = dash_requests.callback_body(dependency, values, changed)
+        sizes, seconds, serialization = [], [], []
+        for _ in range(repeat):
+            del timings[:]
+            started = time.perf_counter()
+            response = client.post(dash_requests.UPDATE_PATH, json=body, headers={'Accept-Encoding': 'br, gzip'})
+            seconds.append(time.perf_counter() - started)
+            serialization.append(sum(timings))
+            sizes.append(len(response.data))
+        if output == 'final-df.data':
+            # The store is needed by the following callbacks, read it back from the uncompressed response
+            plain = client.post(dash_requests.UPDATE_PATH, json=body, headers={'Accept-Encoding': 'identity'})
+            dash_requests.apply_response(values, plain.get_json())
+        results[output] = {
+            'bytes': sizes[-1],
+            'encoding': response.headers.get('Content-Encoding', 'identity'),
+            'request_ms': min(seconds) * 1000,
+            'serialize_ms': min(serialization) * 1000,
+        }
+    server.shutdown()
+    return results
+
+
+# This function runs the measurement in a child process with the given environment and returns its results.
+def run_mode(fast, days, repeat):
+    env = dict(os.environ, NEO_FAST_PAYLOADS="1" if fast else "0")
+    env.pop("NEO_ARCHIVE_DIR", None)
+    output = subprocess.run([sys.executable, os.path.abspath(__file__), "--worker", "--days", str(days), "--repeat", str(repeat)],
+                            env=env, check=True, capture_output=True, text=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Payload size and serialization time per callback.")
+    parser.add_argument("--days", type=int, default=60, help="Length of the downloaded date range.")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        print(json.dumps(measure(args.days, args.repeat)))
+        sys.exit(0)
+
+    baseline = run_mode(False, args.days, args.repeat)
+    fast = run_mode(True, args.days, args.repeat)
+    print(f"{args.days} days of stub data, best of {args.repeat} requests\n")
+    print(f"{'callback output':<28}{'bytes before':>14}{'bytes after':>14}{'encoding':>10}"
+          f"{'serialize ms':>16}{'request ms':>16}")
+    for output in MEASURED_OUTPUTS:
+        b, f = baseline[output], fast[output]
+        print(f"{output:<28}{b['bytes']:>14,}{f['bytes']:>14,}{f['encoding']:>10}"
+              f"{b['serialize_ms']:>7.1f} -> {f['serialize_ms']:<6.1f}{b['request_ms']:>7.1f} -> {f['request_ms']:<6.1f}")
@@ -0,0 +1,100 @@
+import os
+import sys
+import time
+import argparse
+import tempfile
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import topk
+
+# Latency benchmark of the top-K queries on synthetic data, run from the repository root:
+#     python benchmarks/topk_benchmark.py --rows 10000000
+
+
+# This function generates a synthetic processed dataset with the columns used by the top-K queries.
+def synthetic_data(rows, years, seed=0):
+    rng = np.random.default_rng(seed)
+    days = pd.date_range("2000-01-01", periods=365 * years, freq="D").strftime("%Y-%m-%d").to_numpy(dtype=object)
+    ids = np.arange(rows).astype(str).astype(object)
+    magnitude = rng.uniform(15, 32, rows)
+    diameter = 1329 / np.sqrt(0.05) * 10 ** (-0.2 * magnitude)
+    miss = rng.uniform(0.002, 0.5, rows) * 149597870.7
+    df = pd.DataFrame({
+        'id': ids,
+        'name': ids,
+        'date': np.sort(days[rng.integers(0, len(days), rows)]),
+        topk.HAZARD_COLUMN: (diameter > 0.14) & (miss < 0.05 * 149597870.7),
+        'absolute_magnitude_h': magnitude,
+        'miss_dist_km': miss,
+        'relative_velocity_km/s': rng.lognormal(2.6, 0.45, rows),
+        'kilometers.estimated_diameter_max': diameter,
+        'nasa_jpl_url': "https://ssd.jpl.nasa.gov/tools/sbdb_lookup.html",
+    })
+    return df
+
+
+# This function returns the best wall time in milliseconds of several runs of a function.
+def best_ms(function, repeat):
+    times = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - started)
+    return min(times) * 1000
+
+
+# This function writes the synthetic data as a year/month partitioned archive in the layout of the backfill.
+def write_archive(df, archive_dir):
+    for month, part in df.groupby(df['date'].str[:7]):
+        partition = os.path.join(archive_dir, f"year={month[:4]}", f"month={month[5:7]}")
+        os.makedirs(partition, exist_ok=True)
+        part.to_parquet(os.path.join(partition, "data.parquet"), index=False)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Latency benchmark of the top-K query engine.")
+    parser.add_argument("--rows", type=int, default=10_000_000)
+    parser.add_argument("--years", type=int, default=30)
+    parser.add_argument("-k", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--skip-archive", action="store_true", help="Skip the benchmark of the Parquet archive.")
+    args = parser.parse_args()
+    k = args.k
+
+    print(f"Generating {args.rows:,} rows over {args.years} years")
+    df = synthetic_data(args.rows, args.years)
+    values = df['miss_dist_km'].to_numpy()
+
+    results = []
+    results.append(("full sort (np.argsort)", best_ms(lambda: np.argsort(values)[:k], args.repeat)))
+    results.append(("pandas nsmallest", best_ms(lambda: df.nsmallest(k, 'miss_dist_km'), args.repeat)))
+    results.append(("argpartition (topk.top_k_indices)", best_ms(lambda: topk.top_k_indices(values, k), args.repeat)))
+    results.append(("topk.top_k on the DataFrame", best_ms(lambda: topk.top_k(df, 'closest', k), args.repeat)))
+
+    # Per-partition summaries merged across the whole range, against scanning every partition
+    partitions = [part for _, part in df.groupby(df['date'].str[:7])]
+    started = time.perf_counter()
+    summaries = [topk.summarize(part, k) for part in partitions]
+    results.append((f"build {len(partitions)} partition summaries", (time.perf_counter() - started) * 1000))
+    closest = [s[(s['metric'] == 'closest') & (s['subset'] == 'all')] for s in summaries]
+    results.append(("merge partition summaries", best_ms(lambda: topk.merge_top_k(closest, 'closest', k), args.repeat)))
+    results.append(("scan partitions and merge", best_ms(
+        lambda: topk.merge_top_k([topk.top_k(p, 'closest', k) for p in partitions], 'closest', k), args.repeat)))
+
+    if not args.skip_archive:
+        with tempfile.TemporaryDirectory() as archive_dir:
+            write_archive(df, archive_dir)
+            middle = df['date'].iloc[len(df) // 2]
+            results.append(("archive query, no summaries", best_ms(
+                lambda: topk.query_archive(archive_dir, 'closest', k), args.repeat)))
+            topk.build_summaries(archive_dir)
+            results.append(("archive query, whole range", best_ms(
+                lambda: topk.query_archive(archive_dir, 'closest', k), args.repeat)))
+            results.append((f"archive query, {middle[:4]}-01-15..{middle}", best_ms(
+                lambda: topk.query_archive(archive_dir, 'closest', k, f"{middle[:4]}-01-15", middle), args.repeat)))
+
+    print(f"\nTop-{k} closest approaches, best of {args.repeat} runs")
+    for name, ms in results:
+        print(f"{name:<45} {ms:>10.1f} ms")
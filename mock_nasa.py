@@ -0,0 +1,159 @@
+import json
+import random
+import datetime
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+# Local stub of the NeoWs feed endpoint used to exercise the backfill and the dashboard without a NASA API key.
+# Responses are deterministic: the objects of a day are always generated from the same seed.
+
+FEED_PATH = "/neo/rest/v1/feed"
+MAX_FEED_DAYS = 7
+
+# Conversion factors used to fill all the unit variants the real API returns
+KM_TO_MILES = 0.621371
+KM_TO_FEET = 3280.84
+KM_PER_AU = 149597870.7
+KM_PER_LUNAR = 384400.0
+
+
+# This function generates the synthetic near-Earth objects approaching on a given day.
+def neo_objects(day, objects_per_day):
+    day_date = datetime.datetime.strptime(day, "%Y-%m-%d")
+    rng = random.Random(day_date.toordinal())
+    objects = []
+    for i in range(rng.randint(objects_per_day // 2, objects_per_day * 3 // 2)):
+        neo_id = f"{day_date.toordinal()}{i:03d}"
+        magnitude = rng.uniform(15, 32)
+        diameter_max = 1329 / (0.05 ** 0.5) * 10 ** (-0.2 * magnitude)
+        diameter_min = diameter_max * (0.05 / 0.25) ** 0.5
+        velocity = rng.lognormvariate(2.6, 0.45)
+        miss_km = rng.uniform(0.002, 0.5) * KM_PER_AU
+        approach = day_date + datetime.timedelta(minutes=rng.randint(0, 24 * 60 - 1))
+        objects.append({
+            "links": {"self": f"http://localhost{FEED_PATH.replace('feed', 'neo')}/{neo_id}"},
+            "id": neo_id,
+            "neo_reference_id": neo_id,
+            "name": f"({day_date.year} {chr(65 + i % 26)}{i})",
+            "nasa_jpl_url": f"https://ssd.jpl.nasa.gov/tools/sbdb_lookup.html#/?sstr={neo_id}",
+            "absolute_magnitude_h": round(magnitude, 2),
+            "estimated_diameter": {
+                unit: {"estimated_diameter_min": diameter_min * factor, "estimated_diameter_max": diameter_max * factor}
+                for unit, factor in [("kilometers", 1), ("meters", 1000), ("miles", KM_TO_MILES), ("feet", KM_TO_FEET)]
+            },
+            "is_potentially_hazardous_asteroid": diameter_max > 0.14 and miss_km < 0.05 * KM_PER_AU,
+            "close_approach_data": [{
+                "close_approach_date": day,
+                "close_approach_date_full": approach.strftime("%Y-%b-%d %H:%M"),
+                "epoch_date_close_approach": int((approach - datetime.datetime(1970, 1, 1)).total_seconds() * 1000),
+                "relative_velocity": {
+                    "kilometers_per_second": str(velocity),
+                    "kilometers_per_hour": str(velocity * 3600),
+                    "miles_per_hour": str(velocity * 3600 * KM_TO_MILES)
+                },
+                "miss_distance": {
+                    "astronomical": str(miss_km / KM_PER_AU),
+                    "lunar": str(miss_km / KM_PER_LUNAR),
+                    "kilometers": str(miss_km),
+                    "miles": str(miss_km * KM_TO_MILES)
+                },
+                "orbiting_body": "Earth"
+            }],
+            "is_sentry_object": False
+        })
+    return objects
+
+
+# This function builds the feed response for a date range in the same shape as the NeoWs API.
+def feed_response(start_date, end_date, objects_per_day):
+    start = datetime.datetime.strptime(start_date, "%Y-%m-%d")
+    end = datetime.datetime.strptime(end_date, "%Y-%m-%d")
+    near_earth_objects = {}
+    while start <= end:
+        day = start.strftime("%Y-%m-%d")
+        near_earth_objects[day] = neo_objects(day, objects_per_day)
+        start += datetime.timedelta(days=1)
+    return {
+        "links": {},
+        "element_count": sum(len(v) for v in near_earth_objects.values()),
+        "near_earth_objects": near_earth_objects
+    }
+
+
+# Request handler serving the feed endpoint, the server object carries the configuration and the request counter.
+class FeedHandler(BaseHTTPRequestHandler):
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        query = {k: v[0] for k, v in parse_qs(url.query).items()}
+        if url.path != FEED_PATH:
+            return self.send_json(404, {"error": {"code": "NOT_FOUND", "message": f"No such endpoint: {url.path}"}})
+
+        with self.server.lock:
+            self.server.requests_served += 1
+            count = self.server.requests_served
+        remaining = max(0, self.server.rate_limit - count)
+
+        # Simulate the API rate limit on every n-th request so that clients can exercise their backoff
+        if self.server.throttle_every and count % self.server.throttle_every == 0:
+            return self.send_json(429, {"error": {"code": "OVER_RATE_LIMIT", "message": "You have exceeded your rate limit."}},
+                                  {"Retry-After": "1", "X-RateLimit-Remaining": "0"})
+        try:
+            start = datetime.datetime.strptime(query["start_date"], "%Y-%m-%d")
+            end = datetime.datetime.strptime(query.get("end_date", query["start_date"]), "%Y-%m-%d")
+        except (KeyError, ValueError):
+            return self.send_json(400, {"error": {"code": "BAD_REQUEST", "message": "Date Format Exception - Expected format (yyyy-mm-dd)"}})
+        if end < start or (end - start).days > MAX_FEED_DAYS:
+            return self.send_json(400, {"error": {"code": "BAD_REQUEST", "message": "The Feed date limit is only 7 Days"}})
+
+        feed = feed_response(start.strftime("%Y-%m-%d"), end.strftime("%Y-%m-%d"), self.server.objects_per_day)
+        self.send_json(200, feed, {"X-RateLimit-Limit": str(self.server.rate_limit), "X-RateLimit-Remaining": str(remaining)})
+
+    def send_json(self, status, body, headers=None):
+        payload = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+
+# This function creates the stub server, port 0 picks a free port which can be read from server.server_address.
+def make_server(host="127.0.0.1", port=0, objects_per_day=20, rate_limit=1000, throttle_every=0, verbose=False):
+    server = ThreadingHTTPServer((host, port), FeedHandler)
+    server.objects_per_day = objects_per_day
+    server.rate_limit = rate_limit
+    server.throttle_every = throttle_every
+    server.verbose = verbose
+    server.requests_served = 0
+    server.lock = threading.Lock()
+    return server
+
+
+# This function starts the stub server in a daemon thread and returns it together with the feed URL to use as NASA_API_URL.
+def serve_in_background(**kwargs):
+    server = make_server(**kwargs)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    host, port = server.server_address[:2]
+    return server, f"http://{host}:{port}{FEED_PATH}"
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Local stub of the NASA NeoWs feed API.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8051)
+    parser.add_argument("--objects-per-day", type=int, default=20, help="Average number of generated objects per day.")
+    parser.add_argument("--rate-limit", type=int, default=1000, help="Value reported in the X-RateLimit-Limit header.")
+    parser.add_argument("--throttle-every", type=int, default=0, help="Answer every n-th request with HTTP 429 (0 disables).")
+    args = parser.parse_args()
+    server = make_server(args.host, args.port, args.objects_per_day, args.rate_limit, args.throttle_every, verbose=True)
+    print(f"Serving the NeoWs stub on http://{args.host}:{args.port}{FEED_PATH}")
+    server.serve_forever()
@@ -1,10 +1,16 @@
 import requests
 import pandas as pd
 import datetime
+import os
+import sys
+import argparse
+
+# Base URL of the NeoWs feed endpoint, can be pointed at a local stub API through the NASA_API_URL environment variable.
+NASA_API_URL = os.environ.get("NASA_API_URL", "https://api.nasa.gov/neo/rest/v1/feed")
 
 #request to the NASA API to retrieve data about near-Earth objects for a specified date range.
-def request_nasa(start_date: str, end_date: str, key:str):
-    request_url = f"https://api.nasa.gov/neo/rest/v1/feed?start_date={start_date}&end_date={end_date}&api_key={key}"
+def request_nasa(start_date: str, end_date: str, key:str, base_url=None):
+    request_url = f"{base_url or NASA_API_URL}?start_date={start_date}&end_date={end_date}&api_key={key}"
     r = requests.get(request_url)
     if r.status_code != 200:
         print(r.content)
@@ -20,7 +26,11 @@ def download_data(api_key, start_date, end_date):
     for d in days_from_period[::8]:
         df1 = ((eight_days(api_key, d,days_from_period)))
         raw = pd.concat([raw, df1], ignore_index=True)
-    
+    return process_raw(raw)
+
+
+# This function normalizes the nested JSON fields of the raw NEO DataFrame (diameter, velocity and miss distance) and renames the columns for clarity.
+def process_raw(raw):
     dia = raw["estimated_diameter"]
     close = raw['close_approach_data']
     dia_list = dia.tolist()
@@ -99,3 +109,27 @@ def eight_days(api_key, start_d, days_from_period):
     return(raw1)
 
 
+# This function builds the raw DataFrame from a single feed response, one row per object with the approach date inserted as the second column.
+def feed_frame(feed):
+    raw = pd.DataFrame()
+    for day in sorted(feed["near_earth_objects"]):
+        df = pd.DataFrame(feed["near_earth_objects"][day])
+        if df.empty:
+            continue
+        df.insert(1, 'date', day)
+        raw = pd.concat([raw, df], ignore_index=True)
+    return raw
+
+
+# Command line entry point, e.g. python -m nasa backfill --start 2000-01-01 --end 2020-12-31 --out archive
+def main(argv=None):
+    import backfill
+    parser = argparse.ArgumentParser(prog="python -m nasa", description="Command line tools for the NASA NeoWs API.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    backfill.add_arguments(commands.add_parser("backfill", help="Download a date range into a resumable partitioned archive."))
+    args = parser.parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
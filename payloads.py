@@ -0,0 +1,83 @@
+import base64
+import importlib.util
+import numpy as np
+import dash
+
+# Opt-in fast path for the payloads the dashboard sends to the browser (enabled with NEO_FAST_PAYLOADS=1):
+# the numeric arrays of the figures are sent as typed binary arrays in Plotly's base64 "bdata" format (downcast from
+# float64 to float32), and the Flask responses are compressed with brotli or gzip. The JSON encoding itself is not
+# changed, plotly's default "auto" engine already uses orjson whenever it is installed.
+
+# Type codes of the typed arrays plotly.js can decode
+TYPED_ARRAY_DTYPES = {'int8': 'i1', 'uint8': 'u1', 'int16': 'i2', 'uint16': 'u2',
+                      'int32': 'i4', 'uint32': 'u4', 'float32': 'f4', 'float64': 'f8'}
+
+# MIME types compressed by the server, the callback responses are JSON
+COMPRESS_MIMETYPES = ['application/json', 'text/html', 'text/css', 'application/javascript']
+
+
+# This function checks whether the plotly.js bundled with the installed Dash decodes typed arrays (plotly.js 2.28+, shipped since Dash 2.17).
+def typed_arrays_supported():
+    version = tuple(int(part) for part in dash.__version__.split(".")[:2])
+    return version >= (2, 17)
+
+
+# This function encodes a numeric array as a plotly typed array, float64 is downcast to float32 and int64 to int32 when the values fit.
+def encode_array(array, downcast=True):
+    array = np.asarray(array)
+    if array.dtype == np.float64 and downcast:
+        array = array.astype(np.float32)
+    elif array.dtype == np.int64:
+        if len(array) and (array.min() < np.iinfo(np.int32).min or array.max() > np.iinfo(np.int32).max):
+            array = array.astype(np.float64)
+        else:
+            array = array.astype(np.int32)
+    typed = {'dtype': TYPED_ARRAY_DTYPES[array.dtype.name],
+             'bdata': base64.b64encode(np.ascontiguousarray(array, dtype=array.dtype.newbyteorder('<')).tobytes()).decode('ascii')}
+    if array.ndim > 1:
+        typed['shape'] = ",".join(str(n) for n in array.shape)
+    return typed
+
+
+# This function decodes a plotly typed array back to a NumPy array.
+def decode_array(typed):
+    array = np.frombuffer(base64.b64decode(typed['bdata']), dtype=np.dtype(typed['dtype']).newbyteorder('<'))
+    if 'shape' in typed:
+        array = array.reshape([int(n) for n in str(typed['shape']).split(",")])
+    return array
+
+
+# This function walks the trace properties and replaces numeric arrays (NumPy arrays or float64 typed arrays) with compact typed arrays.
+def compact_value(value, downcast=True):
+    if isinstance(value, np.ndarray):
+        if value.dtype.name in TYPED_ARRAY_DTYPES or value.dtype == np.int64:
+            return encode_array(value, downcast)
+        return value
+    if isinstance(value, dict):
+        if 'bdata' in value and 'dtype' in value:
+            return encode_array(decode_array(value), downcast) if value['dtype'] == 'f8' else value
+        return {k: compact_value(v, downcast) for k, v in value.items()}
+    if isinstance(value, (list, tuple)) and value and isinstance(value[0], dict):
+        return [compact_value(v, downcast) for v in value]
+    return value
+
+
+# This function converts a figure to the compact dictionary returned by the callbacks, only the trace data is compacted.
+def compact_figure(fig, downcast=True):
+    figure = fig.to_plotly_json() if hasattr(fig, 'to_plotly_json') else dict(fig)
+    if not typed_arrays_supported():
+        return figure
+    figure['data'] = [compact_value(trace, downcast) for trace in figure.get('data', [])]
+    return figure
+
+
+# This function enables the response compression of the fast path on a Dash app, it depends on the optional packages
+# flask-compress and brotli (gzip is used without brotli, nothing is compressed without flask-compress).
+def enable(app):
+    if not importlib.util.find_spec("flask_compress"):
+        print("flask-compress is not installed, the responses are sent uncompressed")
+        return
+    from flask_compress import Compress
+    app.server.config['COMPRESS_ALGORITHM'] = ['br', 'gzip'] if importlib.util.find_spec("brotli") else ['gzip']
+    app.server.config['COMPRESS_MIMETYPES'] = COMPRESS_MIMETYPES
+    Compress(app.server)
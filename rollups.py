@@ -0,0 +1,251 @@
+import os
+import datetime
+import numpy as np
+import pandas as pd
+import topk
+
+# Daily rollups and rolling time-series analytics (counts, hazardous fraction, median miss distance).
+# A daily rollup holds the number of objects, the number of hazardous objects and a histogram of the miss
+# distances of one day. Rollups of consecutive days can be added up, so a rolling window is the difference of two
+# prefix sums and the median of a window is read from its summed histogram. Every partition of a backfill archive
+# keeps the rollups of its days in _rollup.parquet, the backfill refreshes them for the partitions it writes.
+
+ROLLUP_NAME = "_rollup.parquet"
+
+# File in the archive directory which build_rollups rewrites after every build, its modification time tells readers
+# that the rollups changed without scanning the partitions
+ROLLUP_VERSION_NAME = "_rollup_version"
+
+# Rolling window lengths in days
+WINDOWS = (7, 30, 365)
+
+# Histogram bins of the miss distance, 0.05 decades wide between 1,000 km and 10^9 km (values outside go to the edge bins)
+MISS_BIN_EDGES = np.arange(3, 9.0001, 0.05)
+MISS_BINS = len(MISS_BIN_EDGES) - 1
+bin_columns = [f"miss_bin_{i:03d}" for i in range(MISS_BINS)]
+
+# Labels of the time-series metrics for the dashboard
+metric_labels = {
+    'count': 'Asteroid Count',
+    'hazardous_fraction': 'Hazardous Fraction',
+    'median_miss_km': 'Median Miss Distance (km)',
+}
+
+
+# This function computes the daily rollups of a processed DataFrame, one row per day with objects.
+def daily_rollup(df):
+    dates = pd.to_datetime(df['date']).dt.normalize()
+    miss = pd.to_numeric(df['miss_dist_km'], errors='coerce').to_numpy(dtype=float)
+    bins = np.clip(np.searchsorted(MISS_BIN_EDGES, np.log10(np.where(miss > 0, miss, np.nan)), side='right') - 1, 0, MISS_BINS - 1)
+    valid = ~np.isnan(miss) & (miss > 0)
+    histogram = np.zeros((len(df), MISS_BINS), dtype=np.int32)
+    histogram[np.flatnonzero(valid), bins[valid]] = 1
+    rows = pd.concat([
+        pd.DataFrame({'date': dates.to_numpy(), 'count': 1, 'hazardous': df[topk.HAZARD_COLUMN].astype(bool).astype(int).to_numpy()}),
+        pd.DataFrame(histogram, columns=bin_columns)], axis=1)
+    return rows.groupby('date', as_index=False).sum()
+
+
+# This function (re)builds the rollup files of the given partitions, by default of every partition of the archive.
+def build_rollups(archive_dir, partitions=None):
+    partitions = topk.list_partitions(archive_dir) if partitions is None else partitions
+    for partition in partitions:
+        df = topk.read_partition(archive_dir, partition, ['date', topk.HAZARD_COLUMN, 'miss_dist_km'])
+        daily_rollup(df).to_parquet(os.path.join(archive_dir, partition, ROLLUP_NAME), index=False)
+    if not partitions:
+        return
+    with open(os.path.join(archive_dir, ROLLUP_VERSION_NAME), "w") as f:
+        f.write(datetime.datetime.now().isoformat())
+
+
+# This function loads the daily rollups of an archive between start_date and end_date (both inclusive),
+# partitions without a fresh rollup file are rolled up from their data.
+def load_daily_rollups(archive_dir, start_date, end_date):
+    frames = []
+    for partition in topk.list_partitions(archive_dir):
+        first, last = topk.partition_range(partition)
+        if last < start_date or first > end_date:
+            continue
+        if topk.summary_is_fresh(archive_dir, partition, ROLLUP_NAME):
+            frames.append(pd.read_parquet(os.path.join(archive_dir, partition, ROLLUP_NAME)))
+        else:
+            frames.append(daily_rollup(topk.read_partition(archive_dir, partition, ['date', topk.HAZARD_COLUMN, 'miss_dist_km'])))
+    if not frames:
+        return pd.DataFrame(columns=['date', 'count', 'hazardous'] + bin_columns)
+    daily = pd.concat(frames, ignore_index=True)
+    daily['date'] = pd.to_datetime(daily['date'])
+    daily = daily[(daily['date'] >= start_date) & (daily['date'] <= end_date)]
+    return daily.groupby('date', as_index=False).sum()
+
+
+# Array which grows at both ends. The data sits in the middle of a larger buffer, so adding rows at either end
+# writes into free space and only copies the data when the buffer is full, after which the capacity doubles.
+# Adding n rows therefore costs amortized O(n) regardless of the number of rows already stored.
+class GrowableArray:
+
+    def __init__(self, row_shape=(), dtype=float):
+        self.data = np.empty((16,) + tuple(row_shape), dtype=dtype)
+        self.start = self.stop = 8
+
+    def __len__(self):
+        return self.stop - self.start
+
+    # This method returns the stored rows as a view of the buffer
+    def view(self):
+        return self.data[self.start:self.stop]
+
+    # This method makes sure there is room for front rows before and back rows after the data
+    def reserve(self, front, back):
+        if self.start >= front and len(self.data) - self.stop >= back:
+            return
+        size = len(self)
+        capacity = max(2 * len(self.data), 2 * (size + front + back))
+        data = np.empty((capacity,) + self.data.shape[1:], dtype=self.data.dtype)
+        start = front + (capacity - size - front - back) // 2
+        data[start:start + size] = self.view()
+        self.data, self.start, self.stop = data, start, start + size
+
+    def append(self, rows):
+        self.reserve(0, len(rows))
+        self.data[self.stop:self.stop + len(rows)] = rows
+        self.stop += len(rows)
+
+    def prepend(self, rows):
+        self.reserve(len(rows), 0)
+        self.data[self.start - len(rows):self.start] = rows
+        self.start -= len(rows)
+
+
+# Rolling windows over daily rollups that are extended incrementally. The aggregator covers one contiguous range of
+# days and keeps prefix sums of the counts and histograms plus the computed rolling values of every day, all in
+# GrowableArray buffers. Extending the range at either end computes the prefix sums of the new days and the rolling
+# values of the days whose windows changed, i.e. amortized O(new days + window length) instead of recomputing the range.
+class RollingAggregator:
+
+    def __init__(self, windows=WINDOWS):
+        self.windows = tuple(windows)
+        self.first_day = None
+        self.days = 0
+        self.prefix_count = GrowableArray(dtype=np.int64)
+        self.prefix_hazardous = GrowableArray(dtype=np.int64)
+        self.prefix_histogram = GrowableArray((MISS_BINS,), dtype=np.int64)
+        self.prefix_covered = GrowableArray(dtype=np.int64)
+        for prefix in (self.prefix_count, self.prefix_hazardous, self.prefix_histogram, self.prefix_covered):
+            prefix.append(np.zeros((1,) + prefix.data.shape[1:], dtype=np.int64))
+        self.values = {w: {m: GrowableArray() for m in metric_labels} for w in self.windows}
+
+    # This method returns the last day covered by the aggregator
+    @property
+    def last_day(self):
+        return None if self.first_day is None else self.first_day + datetime.timedelta(days=self.days - 1)
+
+    # This method returns the date ranges between start and end (datetime.date) which are not covered yet
+    def missing(self, start, end):
+        if self.first_day is None:
+            return [(start, end)]
+        ranges = []
+        if start < self.first_day:
+            ranges.append((start, min(end, self.first_day - datetime.timedelta(days=1))))
+        if end > self.last_day:
+            ranges.append((max(start, self.last_day + datetime.timedelta(days=1)), end))
+        return ranges
+
+    # This method adds the daily rollups of the days from start to end (datetime.date), which have to be adjacent to the
+    # covered range. Days without a rollup row count as days without objects, unless covered (a boolean per day, by
+    # default all True) marks them as days without data, e.g. not yet downloaded into the archive
+    def extend(self, daily, start, end, covered=None):
+        if self.first_day is not None and not (end + datetime.timedelta(days=1) == self.first_day or
+                                               start - datetime.timedelta(days=1) == self.last_day):
+            raise ValueError(f"{start}..{end} is not adjacent to the covered range {self.first_day}..{self.last_day}")
+        days = pd.date_range(start, end, freq='D')
+        daily = daily.assign(date=pd.to_datetime(daily['date'])).set_index('date').reindex(days, fill_value=0)
+        added = {
+            'count': daily['count'].to_numpy(dtype=np.int64),
+            'hazardous': daily['hazardous'].to_numpy(dtype=np.int64),
+            'histogram': daily[bin_columns].to_numpy(dtype=np.int64),
+            'covered': np.ones(len(days), dtype=np.int64) if covered is None else np.asarray(covered, dtype=np.int64),
+        }
+        if len(added['covered']) != len(days):
+            raise ValueError(f"covered has {len(added['covered'])} values for {len(days)} days")
+        prefixes = {'count': self.prefix_count, 'hazardous': self.prefix_hazardous, 'histogram': self.prefix_histogram,
+                    'covered': self.prefix_covered}
+
+        if self.first_day is None or start > self.last_day:
+            # Append: the prefix sums continue from the last one
+            for name, prefix in prefixes.items():
+                prefix.append(prefix.view()[-1] + np.cumsum(added[name], axis=0))
+            if self.first_day is None:
+                self.first_day = start
+            changed = (self.days, self.days + len(days))
+            self.days += len(days)
+            for w in self.windows:
+                new_values = self.compute(w, *changed)
+                for m in metric_labels:
+                    self.values[w][m].append(new_values[m])
+        else:
+            # Prepend: the prefix sums of the new days are counted back from the first one, only differences of prefix
+            # sums are used so their absolute level does not matter. The new days and the first window - 1 old days change.
+            for name, prefix in prefixes.items():
+                prefix.prepend(prefix.view()[0] - np.cumsum(added[name][::-1], axis=0)[::-1])
+            self.first_day = start
+            self.days += len(days)
+            for w in self.windows:
+                changed = min(self.days, len(days) + w - 1)
+                new_values = self.compute(w, 0, changed)
+                for m in metric_labels:
+                    self.values[w][m].prepend(new_values[m][:len(days)])
+                    self.values[w][m].view()[len(days):changed] = new_values[m][len(days):]
+
+    # This method computes the rolling values of window w for the day positions from start to end (exclusive),
+    # days whose window reaches before the first day or contains days without data are NaN
+    def compute(self, w, start, end):
+        prefix_count = self.prefix_count.view()
+        prefix_hazardous = self.prefix_hazardous.view()
+        prefix_histogram = self.prefix_histogram.view()
+        prefix_covered = self.prefix_covered.view()
+        positions = np.arange(start, end)
+        lower = positions + 1 - w
+        complete = lower >= 0
+        lower = np.maximum(lower, 0)
+        complete &= prefix_covered[positions + 1] - prefix_covered[lower] == w
+        count = (prefix_count[positions + 1] - prefix_count[lower]).astype(float)
+        hazardous = (prefix_hazardous[positions + 1] - prefix_hazardous[lower]).astype(float)
+        histogram = prefix_histogram[positions + 1] - prefix_histogram[lower]
+        with np.errstate(invalid='ignore', divide='ignore'):
+            fraction = hazardous / count
+            median = histogram_median(histogram)
+        return {
+            'count': np.where(complete, count, np.nan),
+            'hazardous_fraction': np.where(complete, fraction, np.nan),
+            'median_miss_km': np.where(complete, median, np.nan),
+        }
+
+    # This method returns the rolling values between start and end (datetime.date) as a DataFrame
+    def frame(self, start=None, end=None):
+        if not self.days:
+            return pd.DataFrame({'date': pd.DatetimeIndex([])}).assign(
+                **{f"{m}_{w}d": np.empty(0) for w in self.windows for m in metric_labels})
+        first = 0 if start is None else max(0, (pd.Timestamp(start).date() - self.first_day).days)
+        last = self.days if end is None else min(self.days, (pd.Timestamp(end).date() - self.first_day).days + 1)
+        last = max(first, last)
+        result = pd.DataFrame({'date': pd.date_range(self.first_day + datetime.timedelta(days=first), periods=last - first, freq='D')})
+        for w in self.windows:
+            for m in metric_labels:
+                result[f"{m}_{w}d"] = self.values[w][m].view()[first:last]
+        return result
+
+
+# This function estimates the median miss distance from rows of histogram counts, interpolating inside the median bin
+# on the logarithmic scale of the bins. Rows without objects give NaN.
+def histogram_median(histogram):
+    histogram = np.atleast_2d(histogram)
+    cumulative = np.cumsum(histogram, axis=1)
+    total = cumulative[:, -1]
+    half = total / 2
+    index = np.minimum((cumulative < half[:, None]).sum(axis=1), MISS_BINS - 1)
+    rows = np.arange(len(histogram))
+    before = np.where(index > 0, cumulative[rows, index - 1], 0)
+    in_bin = histogram[rows, index]
+    share = np.where(in_bin > 0, (half - before) / np.where(in_bin > 0, in_bin, 1), 0)
+    log_median = MISS_BIN_EDGES[index] + share * (MISS_BIN_EDGES[index + 1] - MISS_BIN_EDGES[index])
+    return np.where(total > 0, 10 ** log_median, np.nan)
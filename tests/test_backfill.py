@@ -0,0 +1,149 @@
+import json
+import os
+import time
+import pandas as pd
+import pytest
+import requests
+import backfill
+import mock_nasa
+import nasa
+import rollups
+import topk
+
+START, END = "2020-01-01", "2020-03-31"
+THROTTLE_EVERY = 5
+
+
+@pytest.fixture
+def stub():
+    server, feed_url = mock_nasa.serve_in_background(objects_per_day=5, throttle_every=THROTTLE_EVERY)
+    yield server, feed_url
+    server.shutdown()
+
+
+def run(out_dir, feed_url, max_retries, end=END):
+    return backfill.run_backfill("DEMO_KEY", START, end, str(out_dir), feed_url, max_retries=max_retries,
+                                 backoff=0.01, quota_period=1, log=lambda message: None)
+
+
+def read_manifest(out_dir):
+    with open(os.path.join(out_dir, backfill.MANIFEST_NAME)) as f:
+        return json.load(f)
+
+
+def test_plan_windows_are_aligned_blocks():
+    windows = backfill.plan_windows("2020-03-05", "2020-03-10")
+    assert windows == [("2020-02-28", "2020-03-06"), ("2020-03-07", "2020-03-14")]
+    # An extended range reuses the windows of the shorter one
+    assert backfill.plan_windows("2020-03-05", "2020-04-10")[:2] == windows
+
+
+@pytest.mark.parametrize("start, end, message", [
+    ("2020-03-10", "2020-03-07", "after --end"),
+    ("2020-02-30", "2020-03-07", "YYYY-MM-DD"),
+    ("2020/03/01", "2020-03-07", "YYYY-MM-DD"),
+])
+def test_command_rejects_invalid_ranges(tmp_path, start, end, message):
+    with pytest.raises(SystemExit, match=message):
+        nasa.main(["backfill", "--start", start, "--end", end, "--out", str(tmp_path)])
+    assert not os.listdir(tmp_path)
+    with pytest.raises(ValueError):
+        backfill.plan_windows(start, end)
+
+
+def test_backfill_resumes_after_rate_limit_abort(stub, tmp_path):
+    server, feed_url = stub
+    windows = backfill.plan_windows(START, END)
+
+    # Without retries the first HTTP 429 of the stub aborts the run
+    with pytest.raises(Exception, match="HTTP 429"):
+        run(tmp_path, feed_url, max_retries=0)
+    completed = read_manifest(tmp_path)["windows"]
+    assert len(completed) == THROTTLE_EVERY - 1
+
+    # The resumed run retries the 429 responses and downloads only the missing windows
+    result = run(tmp_path, feed_url, max_retries=3)
+    assert result["windows"] == len(windows) - len(completed)
+    assert server.requests_served > len(windows) + 1
+
+    manifest = read_manifest(tmp_path)
+    assert manifest["window_days"] == backfill.WINDOW_DAYS
+    assert sorted(manifest["windows"]) == [backfill.window_key(w) for w in windows]
+    for key, entry in completed.items():
+        assert manifest["windows"][key] == entry
+
+    df = pd.read_parquet(tmp_path)
+    assert len(df) == sum(entry["rows"] for entry in manifest["windows"].values())
+    assert not df["id"].duplicated().any()
+    assert df["date"].min() == windows[0][0] and df["date"].max() == windows[-1][1]
+    assert df["miss_dist_km"].dtype == float
+
+    # Every partition, including the ones written before the abort, has fresh summaries
+    for partition in topk.list_partitions(tmp_path):
+        assert topk.summary_is_fresh(tmp_path, partition)
+        assert topk.summary_is_fresh(tmp_path, partition, rollups.ROLLUP_NAME)
+
+
+def test_extended_range_does_not_duplicate_rows(stub, tmp_path):
+    _, feed_url = stub
+    run(tmp_path, feed_url, max_retries=3, end="2020-02-10")
+    run(tmp_path, feed_url, max_retries=3, end="2020-03-10")
+    df = pd.read_parquet(tmp_path)
+    assert not df["id"].duplicated().any()
+    assert len(df) == sum(entry["rows"] for entry in read_manifest(tmp_path)["windows"].values())
+
+
+# Session whose first requests fail with a network error before the real requests go through
+class FlakySession:
+
+    def __init__(self, failures, error):
+        self.failures = failures
+        self.error = error
+        self.timeouts = []
+
+    def get(self, url, timeout=None):
+        self.timeouts.append(timeout)
+        if self.failures:
+            self.failures -= 1
+            raise self.error
+        return requests.get(url, timeout=timeout)
+
+
+@pytest.mark.parametrize("error", [requests.ConnectionError("connection reset"), requests.Timeout("read timed out")])
+def test_network_errors_are_retried(stub, error):
+    _, feed_url = stub
+    window = backfill.plan_windows("2020-01-01", "2020-01-01")[0]
+    session = FlakySession(2, error)
+    feed = backfill.fetch_window("DEMO_KEY", window, feed_url, max_retries=2, backoff=0.01, session=session, timeout=5)
+    assert feed["element_count"] > 0
+    assert session.timeouts == [5, 5, 5]
+
+    with pytest.raises(Exception, match="failed after 2 attempts"):
+        backfill.fetch_window("DEMO_KEY", window, feed_url, max_retries=1, backoff=0.01, session=FlakySession(2, error))
+
+
+def test_pacer_follows_the_rate_limit_headers():
+    pacer = backfill.RequestPacer(min_interval=1.0, log=lambda message: None)
+    pacer.update({"X-RateLimit-Limit": "1000", "X-RateLimit-Remaining": "999"})
+    assert pacer.interval == pytest.approx(3.6)
+    pacer.update({"X-RateLimit-Limit": "100000", "X-RateLimit-Remaining": "5"})
+    assert pacer.interval == 1.0
+    pacer.update({"X-RateLimit-Limit": "1000", "X-RateLimit-Remaining": "0"})
+    assert pacer.next_request - time.monotonic() > backfill.QUOTA_PERIOD - 1
+
+
+def test_backfill_waits_for_the_quota_to_reset(tmp_path):
+    server, feed_url = mock_nasa.serve_in_background(objects_per_day=1, rate_limit=4)
+    messages = []
+    try:
+        started = time.monotonic()
+        backfill.run_backfill("DEMO_KEY", "2020-01-01", "2020-02-15", str(tmp_path), feed_url, quota_period=0.2,
+                              log=messages.append)
+        elapsed = time.monotonic() - started
+    finally:
+        server.shutdown()
+    windows = len(backfill.plan_windows("2020-01-01", "2020-02-15"))
+    # The stub reports no remaining requests from the fourth one on, every following request waits for the reset
+    waits = [m for m in messages if m.startswith("API quota used up")]
+    assert len(waits) == windows - 3
+    assert elapsed >= 0.2 * (windows - 4)
@@ -0,0 +1,107 @@
+import os
+import sys
+import numpy as np
+import pytest
+import mock_nasa
+import nasa
+import payloads
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "benchmarks"))
+import dash_requests
+
+# Outputs of the callbacks which read the final-df store
+STORE_OUTPUTS = ['dynamic-plot.figure', 'min-size-slider.max', 'size-comparison-plot.figure', 'bar-chart.figure',
+                 'top-k-chart.figure', 'time-series-chart.figure']
+
+
+def test_float64_is_downcast_to_float32():
+    values = np.array([0.1, 2.5e7, -3.75, np.nan])
+    typed = payloads.encode_array(values)
+    assert typed['dtype'] == 'f4' and 'shape' not in typed
+    decoded = payloads.decode_array(typed)
+    assert decoded.dtype == np.float32
+    np.testing.assert_allclose(decoded, values, rtol=1e-6)
+    assert payloads.encode_array(values, downcast=False)['dtype'] == 'f8'
+
+
+def test_int64_is_sent_as_int32_when_it_fits():
+    values = np.array([0, -5, 2 ** 31 - 1, -2 ** 31], dtype=np.int64)
+    typed = payloads.encode_array(values)
+    assert typed['dtype'] == 'i4'
+    np.testing.assert_array_equal(payloads.decode_array(typed), values)
+
+
+def test_int64_overflow_falls_back_to_float64():
+    values = np.array([1, 2 ** 40, -2 ** 35], dtype=np.int64)
+    typed = payloads.encode_array(values)
+    assert typed['dtype'] == 'f8'
+    np.testing.assert_array_equal(payloads.decode_array(typed), values)
+
+
+def test_two_dimensional_arrays_keep_their_shape():
+    customdata = np.arange(12, dtype=np.float64).reshape(4, 3) / 7
+    trace = payloads.compact_value({'type': 'scatter', 'customdata': customdata})
+    assert trace['customdata']['shape'] == "4,3"
+    decoded = payloads.decode_array(trace['customdata'])
+    assert decoded.shape == (4, 3)
+    np.testing.assert_allclose(decoded, customdata, rtol=1e-6)
+
+
+def test_object_arrays_are_left_untouched():
+    names = np.array(["(2020 AB)", "433 Eros", None], dtype=object)
+    trace = {'type': 'bar', 'x': names, 'marker': {'color': ['red', 'green', 'red']}}
+    compacted = payloads.compact_value(trace)
+    assert compacted['x'] is names
+    assert compacted['marker'] == {'color': ['red', 'green', 'red']}
+
+
+def test_encoded_arrays_are_only_recompacted_from_float64():
+    float64 = payloads.encode_array(np.array([1.5, 2.25]), downcast=False)
+    compacted = payloads.compact_value({'y': float64})['y']
+    assert compacted['dtype'] == 'f4'
+    np.testing.assert_array_equal(payloads.decode_array(compacted), [1.5, 2.25])
+
+    int32 = payloads.encode_array(np.array([1, 2, 3], dtype=np.int32))
+    assert payloads.compact_value({'y': int32})['y'] is int32
+
+
+@pytest.mark.skipif(not payloads.typed_arrays_supported(), reason="Dash without typed array support")
+def test_compact_figure_round_trip():
+    import plotly.graph_objects as go
+    x = np.linspace(0, 1, 50)
+    fig = go.Figure(go.Scatter(x=x, y=x ** 2, customdata=np.stack([x, -x], axis=1), text=[f"p{i}" for i in range(50)]))
+    figure = payloads.compact_figure(fig)
+    trace = figure['data'][0]
+    np.testing.assert_allclose(payloads.decode_array(trace['y']), x ** 2, rtol=1e-6)
+    assert payloads.decode_array(trace['customdata']).shape == (50, 2)
+    assert trace['text'] == [f"p{i}" for i in range(50)]
+    assert figure['layout'] == fig.to_plotly_json()['layout']
+
+
+# This function sends the callbacks reading the final-df store with the store in the given format and returns their responses.
+def store_callbacks(client, values, store):
+    dependencies = client.get("/_dash-dependencies").get_json()
+    values = dict(values, **{'final-df.data': store})
+    responses = {}
+    for output in STORE_OUTPUTS:
+        body = dash_requests.callback_body(dash_requests.find_callback(dependencies, output), values, ['final-df.data'])
+        response = client.post(dash_requests.UPDATE_PATH, json=body)
+        assert response.status_code == 200, output
+        responses[output] = response.get_json()['response']
+    return responses
+
+
+def test_callbacks_accept_the_column_wise_store(monkeypatch):
+    import Visualization
+    monkeypatch.setattr(Visualization, "ARCHIVE_DIR", None)
+    df = nasa.process_raw(nasa.feed_frame(mock_nasa.feed_response("2020-01-01", "2020-01-07", 10)))
+    client = Visualization.app.server.test_client()
+    values = dash_requests.layout_values(client.get("/_dash-layout").get_json())
+    values.update({'date-picker-range.start_date': "2020-01-01", 'date-picker-range.end_date': "2020-01-07"})
+
+    column_wise = store_callbacks(client, values, df.to_dict('list'))
+    index_keyed = store_callbacks(client, values, df.to_dict())
+    for output in STORE_OUTPUTS:
+        component_id, prop = output.rsplit(".", 1)
+        assert column_wise[output][component_id][prop], output
+    assert column_wise == index_keyed
@@ -0,0 +1,123 @@
+import datetime
+import json
+import os
+import numpy as np
+import pandas as pd
+import pytest
+import backfill
+import rollups
+
+START, END = datetime.date(2019, 1, 1), datetime.date(2020, 12, 31)
+
+
+@pytest.fixture(scope="module")
+def objects():
+    rng = np.random.default_rng(0)
+    n = 20000
+    days = pd.date_range(START, END, freq='D').strftime('%Y-%m-%d')
+    return pd.DataFrame({
+        'date': rng.choice(days, n),
+        'is_potentially_hazardous_asteroid': rng.random(n) < 0.1,
+        'miss_dist_km': 10 ** rng.uniform(4, 8, n),
+    })
+
+
+@pytest.fixture(scope="module")
+def daily(objects):
+    return rollups.daily_rollup(objects)
+
+
+def full_frame(daily, covered=None):
+    aggregator = rollups.RollingAggregator()
+    aggregator.extend(daily, START, END, covered)
+    return aggregator.frame()
+
+
+def test_incremental_extension_equals_full_build(daily):
+    aggregator = rollups.RollingAggregator()
+    ranges = [((2019, 6, 1), (2019, 6, 30)), ((2019, 7, 1), (2020, 1, 5)), ((2019, 5, 20), (2019, 5, 31)),
+              ((2019, 1, 1), (2019, 5, 19)), ((2020, 1, 6), (2020, 12, 31))]
+    for first, last in ranges:
+        aggregator.extend(daily, datetime.date(*first), datetime.date(*last))
+    assert aggregator.first_day == START and aggregator.last_day == END
+    pd.testing.assert_frame_equal(aggregator.frame(), full_frame(daily))
+
+
+def test_extension_must_be_adjacent(daily):
+    aggregator = rollups.RollingAggregator()
+    aggregator.extend(daily, datetime.date(2019, 6, 1), datetime.date(2019, 6, 30))
+    with pytest.raises(ValueError):
+        aggregator.extend(daily, datetime.date(2019, 7, 2), datetime.date(2019, 7, 10))
+    assert aggregator.missing(datetime.date(2019, 5, 1), datetime.date(2019, 7, 10)) == [
+        (datetime.date(2019, 5, 1), datetime.date(2019, 5, 31)), (datetime.date(2019, 7, 1), datetime.date(2019, 7, 10))]
+
+
+def test_counts_and_fractions_match_pandas_rolling(daily):
+    frame = full_frame(daily)
+    per_day = daily.set_index('date').reindex(pd.date_range(START, END, freq='D'), fill_value=0)
+    for w in rollups.WINDOWS:
+        count = per_day['count'].rolling(w).sum()
+        hazardous = per_day['hazardous'].rolling(w).sum()
+        np.testing.assert_allclose(frame[f"count_{w}d"], count.to_numpy())
+        np.testing.assert_allclose(frame[f"hazardous_fraction_{w}d"], (hazardous / count).to_numpy())
+
+
+def test_histogram_median_is_close_to_exact_median(objects, daily):
+    frame = full_frame(daily).set_index('date')
+    dates = pd.to_datetime(objects['date'])
+    bin_width = 10 ** (rollups.MISS_BIN_EDGES[1] - rollups.MISS_BIN_EDGES[0]) - 1
+    for w in rollups.WINDOWS:
+        errors = []
+        for day in pd.date_range("2020-01-01", END, freq='17D'):
+            in_window = (dates > day - pd.Timedelta(days=w)) & (dates <= day)
+            exact = objects.loc[in_window, 'miss_dist_km'].median()
+            errors.append(abs(frame.loc[day, f"median_miss_km_{w}d"] / exact - 1))
+        # Every estimate lies within one bin of the exact median, on average within 3 %
+        assert max(errors) < bin_width
+        assert np.mean(errors) < 0.03
+
+
+def test_histogram_median_of_empty_rows_is_nan():
+    histogram = np.zeros((2, rollups.MISS_BINS), dtype=int)
+    histogram[0, 10] = 3
+    median = rollups.histogram_median(histogram)
+    assert 10 ** rollups.MISS_BIN_EDGES[10] <= median[0] <= 10 ** rollups.MISS_BIN_EDGES[11]
+    assert np.isnan(median[1])
+
+
+def test_windows_over_uncovered_days_are_empty(daily):
+    covered = np.ones((END - START).days + 1, dtype=bool)
+    covered[100] = False
+    frame = full_frame(daily, covered)
+    for w in rollups.WINDOWS:
+        values = frame[f"count_{w}d"].to_numpy()
+        assert np.isnan(values[100:100 + w]).all()
+        assert not np.isnan(values[100 + w:]).any()
+        if w <= 100:
+            assert not np.isnan(values[w - 1:100]).any()
+
+
+def test_covered_days_follow_the_manifest(tmp_path):
+    assert backfill.covered_days(str(tmp_path), "2020-01-01", "2020-01-03").all()
+    manifest = {"window_days": 8, "windows": {"2020-01-02_2020-01-09": {}, "2020-01-18_2020-01-25": {}}}
+    with open(os.path.join(tmp_path, backfill.MANIFEST_NAME), "w") as f:
+        json.dump(manifest, f)
+    covered = backfill.covered_days(str(tmp_path), "2020-01-01", "2020-01-27")
+    expected = np.zeros(27, dtype=bool)
+    expected[1:9] = expected[17:25] = True
+    np.testing.assert_array_equal(covered, expected)
+
+
+def test_build_rollups_bumps_the_version_file(objects, tmp_path):
+    archive_dir = str(tmp_path)
+    partition = os.path.join(archive_dir, "year=2019", "month=01")
+    os.makedirs(partition)
+    objects[objects['date'].str.startswith("2019-01")].to_parquet(os.path.join(partition, "data.parquet"), index=False)
+    version_path = os.path.join(archive_dir, rollups.ROLLUP_VERSION_NAME)
+
+    rollups.build_rollups(archive_dir, [])
+    assert not os.path.exists(version_path)
+    rollups.build_rollups(archive_dir)
+    assert os.path.exists(version_path)
+    # The version file is skipped when the archive is read as a dataset
+    assert len(pd.read_parquet(archive_dir)) == objects['date'].str.startswith("2019-01").sum()
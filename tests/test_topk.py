@@ -0,0 +1,105 @@
+import os
+import numpy as np
+import pandas as pd
+import pytest
+import topk
+
+SUMMARY_K = 20
+RANGES = [
+    (None, None),
+    ("2019-01-01", "2019-12-31"),
+    ("2019-02-14", "2019-05-03"),
+    ("2019-03-01", "2019-03-31"),
+    ("2019-06-10", "2019-06-12"),
+    ("2018-11-01", "2019-02-01"),
+]
+
+
+def synthetic_objects(n, days, seed):
+    rng = np.random.default_rng(seed)
+    velocity = rng.uniform(1, 40, n)
+    velocity[rng.random(n) < 0.02] = np.nan
+    return pd.DataFrame({
+        'id': [f"{seed}-{i}" for i in range(n)],
+        'name': [f"({seed} {i})" for i in range(n)],
+        'date': rng.choice(days.strftime('%Y-%m-%d'), n),
+        'is_potentially_hazardous_asteroid': rng.random(n) < 0.1,
+        'absolute_magnitude_h': rng.uniform(15, 30, n),
+        'miss_dist_km': 10 ** rng.uniform(4, 8, n),
+        'relative_velocity_km/s': velocity,
+        'kilometers.estimated_diameter_max': rng.lognormal(-2, 1, n),
+        'nasa_jpl_url': "https://ssd.jpl.nasa.gov",
+    })
+
+
+def write_archive(archive_dir, df, name):
+    for month, part in df.groupby(df['date'].str[:7]):
+        partition = os.path.join(archive_dir, f"year={month[:4]}", f"month={month[5:7]}")
+        os.makedirs(partition, exist_ok=True)
+        part.to_parquet(os.path.join(partition, f"{name}.parquet"), index=False)
+
+
+@pytest.fixture(scope="module")
+def archive(tmp_path_factory):
+    archive_dir = str(tmp_path_factory.mktemp("archive"))
+    df = synthetic_objects(20000, pd.date_range("2018-10-01", "2019-09-30", freq='D'), seed=0)
+    write_archive(archive_dir, df, "data")
+    topk.build_summaries(archive_dir, summary_k=SUMMARY_K)
+    return archive_dir, df
+
+
+def expected(df, metric, k, start_date, end_date, hazardous_only):
+    if start_date:
+        df = df[(df['date'] >= start_date) & (df['date'] <= end_date)]
+    return topk.top_k(df[topk.result_columns], metric, k, hazardous_only)
+
+
+def assert_same_top_k(result, reference, metric):
+    column = topk.metrics[metric][0]
+    assert result['id'].tolist() == reference['id'].tolist()
+    np.testing.assert_array_equal(result[column].to_numpy(dtype=float), reference[column].to_numpy(dtype=float))
+
+
+def test_top_k_indices_match_a_full_sort():
+    values = np.array([5.0, np.nan, 1.0, 9.0, 3.0, np.nan, 7.0])
+    assert topk.top_k_indices(values, 3).tolist() == [2, 4, 0]
+    assert topk.top_k_indices(values, 2, largest=True).tolist() == [3, 6]
+    assert topk.top_k_indices(values, 10).tolist() == [2, 4, 0, 6, 3]
+    assert topk.top_k_indices(values, 0).tolist() == []
+
+
+@pytest.mark.parametrize("metric", list(topk.metrics))
+@pytest.mark.parametrize("hazardous_only", [False, True])
+@pytest.mark.parametrize("k", [1, 10, SUMMARY_K, SUMMARY_K + 15])
+def test_query_archive_matches_top_k_of_all_rows(archive, metric, hazardous_only, k):
+    archive_dir, df = archive
+    for start_date, end_date in RANGES:
+        result = topk.query_archive(archive_dir, metric, k, start_date, end_date, hazardous_only, summary_k=SUMMARY_K)
+        assert_same_top_k(result, expected(df, metric, k, start_date, end_date, hazardous_only), metric)
+
+
+def test_empty_range_returns_no_rows(archive):
+    archive_dir, _ = archive
+    result = topk.query_archive(archive_dir, 'closest', 10, "2025-01-01", "2025-12-31", summary_k=SUMMARY_K)
+    assert result.empty
+
+
+def test_stale_summary_is_not_used(tmp_path):
+    archive_dir = str(tmp_path)
+    days = pd.date_range("2019-01-01", "2019-03-31", freq='D')
+    df = synthetic_objects(3000, days, seed=1)
+    write_archive(archive_dir, df, "data")
+    topk.build_summaries(archive_dir, summary_k=SUMMARY_K)
+
+    # Rows written after the summaries are only found when the stale summaries are skipped
+    extra = synthetic_objects(50, days[days.month == 2], seed=2)
+    extra['miss_dist_km'] = extra['miss_dist_km'] / 1e6
+    write_archive(archive_dir, extra, "late")
+    stale = os.path.join(archive_dir, "year=2019", "month=02")
+    os.utime(os.path.join(stale, "late.parquet"), (os.path.getmtime(os.path.join(stale, topk.SUMMARY_NAME)) + 10,) * 2)
+    assert not topk.summary_is_fresh(archive_dir, os.path.relpath(stale, archive_dir))
+    assert topk.summary_is_fresh(archive_dir, os.path.join("year=2019", "month=01"))
+
+    result = topk.query_archive(archive_dir, 'closest', 10, summary_k=SUMMARY_K)
+    assert_same_top_k(result, expected(pd.concat([df, extra]), 'closest', 10, None, None, False), 'closest')
+    assert set(result['id']) <= set(extra['id'])
@@ -0,0 +1,155 @@
+import os
+import glob
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+
+# Top-K queries ("the 100 closest approaches", "the fastest hazardous objects") over processed asteroid data.
+# Selection uses np.argpartition, which finds the K extreme rows in linear time instead of sorting every row.
+# Each partition of a backfill archive keeps a precomputed summary (_topk.parquet) with its SUMMARY_K extreme rows
+# per metric, so a query over many years merges these small summaries and only scans the partitions cut by the date range.
+
+SUMMARY_NAME = "_topk.parquet"
+
+# Number of rows kept per metric and subset in a partition summary, queries for larger K scan the partitions
+SUMMARY_K = 1000
+
+HAZARD_COLUMN = 'is_potentially_hazardous_asteroid'
+
+# Metric name mapped to the ranked column and whether the largest values come first
+metrics = {
+    'closest': ('miss_dist_km', False),
+    'fastest': ('relative_velocity_km/s', True),
+    'largest': ('kilometers.estimated_diameter_max', True),
+}
+
+# Labels of the metrics for the dashboard
+metric_labels = {
+    'closest': 'Closest Approaches (Miss Distance)',
+    'fastest': 'Fastest Objects (Relative Velocity)',
+    'largest': 'Largest Objects (Estimated Diameter)',
+}
+
+# Columns carried through the queries and stored in the summaries
+result_columns = [
+    'id', 'name', 'date', HAZARD_COLUMN, 'absolute_magnitude_h',
+    'miss_dist_km', 'relative_velocity_km/s', 'kilometers.estimated_diameter_max', 'nasa_jpl_url'
+]
+
+
+# This function returns the positions of the k smallest (or largest) values ordered from the most extreme one, NaN values are skipped.
+def top_k_indices(values, k, largest=False):
+    values = np.asarray(values, dtype=float)
+    valid = np.flatnonzero(~np.isnan(values))
+    keys = -values[valid] if largest else values[valid]
+    if k <= 0:
+        return valid[:0]
+    if k < len(keys):
+        part = np.argpartition(keys, k - 1)[:k]
+    else:
+        part = np.arange(len(keys))
+    return valid[part[np.argsort(keys[part], kind='stable')]]
+
+
+# This function returns the k most extreme rows of a DataFrame for the chosen metric, optionally only hazardous objects.
+def top_k(df, metric, k=100, hazardous_only=False):
+    column, largest = metrics[metric]
+    if hazardous_only:
+        df = df[df[HAZARD_COLUMN].astype(bool)]
+    values = pd.to_numeric(df[column], errors='coerce').to_numpy(dtype=float)
+    return df.iloc[top_k_indices(values, k, largest)].reset_index(drop=True)
+
+
+# This function merges the top-K results of several partitions (or date ranges) into the overall top-K.
+def merge_top_k(frames, metric, k=100):
+    frames = [f for f in frames if len(f)]
+    if not frames:
+        return pd.DataFrame(columns=result_columns)
+    return top_k(pd.concat(frames, ignore_index=True), metric, k)
+
+
+# This function computes the summary of one partition: the summary_k extreme rows for every metric, for all and for hazardous objects.
+def summarize(df, summary_k=SUMMARY_K):
+    df = df[[c for c in result_columns if c in df.columns]]
+    parts = []
+    for metric in metrics:
+        for subset, hazardous_only in [('all', False), ('hazardous', True)]:
+            part = top_k(df, metric, summary_k, hazardous_only)
+            part.insert(0, 'subset', subset)
+            part.insert(0, 'metric', metric)
+            parts.append(part)
+    return pd.concat(parts, ignore_index=True)
+
+
+# This function lists the year=YYYY/month=MM partition directories of an archive as paths relative to it.
+def list_partitions(archive_dir):
+    pattern = os.path.join(archive_dir, "year=*", "month=*")
+    return sorted(os.path.relpath(p, archive_dir) for p in glob.glob(pattern) if os.path.isdir(p))
+
+
+# This function returns the first and the last day of a partition as date strings.
+def partition_range(partition):
+    year = int(partition.split("year=")[1][:4])
+    month = int(partition.split("month=")[1][:2])
+    first = pd.Timestamp(year=year, month=month, day=1)
+    last = first + pd.offsets.MonthEnd(0)
+    return first.strftime("%Y-%m-%d"), last.strftime("%Y-%m-%d")
+
+
+# This function reads the data files of a partition, the summary file is skipped because of its underscore prefix.
+def read_partition(archive_dir, partition, columns=None):
+    return pd.read_parquet(os.path.join(archive_dir, partition), columns=columns)
+
+
+# This function checks whether the summary file (by default the top-K summary) of a partition exists and is newer than all of its data files.
+def summary_is_fresh(archive_dir, partition, name=SUMMARY_NAME):
+    summary_path = os.path.join(archive_dir, partition, name)
+    if not os.path.exists(summary_path):
+        return False
+    data_files = glob.glob(os.path.join(archive_dir, partition, "[!_]*.parquet"))
+    return all(os.path.getmtime(f) <= os.path.getmtime(summary_path) for f in data_files)
+
+
+# This function (re)builds the summaries of the given partitions, by default of every partition of the archive.
+def build_summaries(archive_dir, partitions=None, summary_k=SUMMARY_K):
+    for partition in (list_partitions(archive_dir) if partitions is None else partitions):
+        df = read_partition(archive_dir, partition, result_columns)
+        summarize(df, summary_k).to_parquet(os.path.join(archive_dir, partition, SUMMARY_NAME), index=False)
+
+
+# This function returns the top-K candidates of one partition, from its summary when the partition lies completely
+# inside the date range and the summary is fresh and long enough, otherwise by scanning the partition.
+# Summary candidates are returned as Arrow tables so that they are converted to pandas once, after concatenation.
+def partition_candidates(archive_dir, partition, metric, k, start_date, end_date, hazardous_only, summary_k):
+    first, last = partition_range(partition)
+    if start_date <= first and last <= end_date and k <= summary_k and summary_is_fresh(archive_dir, partition):
+        subset = 'hazardous' if hazardous_only else 'all'
+        summary = pq.read_table(os.path.join(archive_dir, partition, SUMMARY_NAME))
+        summary = summary.filter(pc.and_(pc.equal(summary['metric'], metric), pc.equal(summary['subset'], subset)))
+        return summary.drop_columns(['metric', 'subset']).slice(0, k)
+    df = read_partition(archive_dir, partition, result_columns)
+    df = df[(df['date'] >= start_date) & (df['date'] <= end_date)]
+    return top_k(df, metric, k, hazardous_only)
+
+
+# This function answers a top-K query over a backfill archive between start_date and end_date (both inclusive).
+# The partitions overlapping the range are read in parallel threads (Parquet reading releases the GIL)
+# and their candidates are merged into the overall top-K.
+def query_archive(archive_dir, metric, k=100, start_date=None, end_date=None, hazardous_only=False,
+                  summary_k=SUMMARY_K, max_workers=8):
+    start_date = start_date or "0000-01-01"
+    end_date = end_date or "9999-12-31"
+    partitions = [p for p in list_partitions(archive_dir)
+                  if partition_range(p)[1] >= start_date and partition_range(p)[0] <= end_date]
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        candidates = list(executor.map(
+            lambda p: partition_candidates(archive_dir, p, metric, k, start_date, end_date, hazardous_only, summary_k),
+            partitions))
+    tables = [c for c in candidates if isinstance(c, pa.Table)]
+    frames = [c for c in candidates if not isinstance(c, pa.Table)]
+    if tables:
+        frames.append(pa.concat_tables(tables).to_pandas())
+    return merge_top_k(frames, metric, k)